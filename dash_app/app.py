@@ -1,6 +1,12 @@
+import time
+STARTED_AT = time.perf_counter()  # Taken before the imports so they count towards startup
 
 import dash
 from dash import dcc, html
+from utils.catalog import get_catalog
+from utils.images import register_image_routes
+from utils.markets import register_market_routes
+from utils.metrics import register_metrics
 
 # Create the Dash app
 app = dash.Dash(
@@ -17,5 +23,31 @@ app.layout = html.Div(
     ]
 )
 
+# Serve locally cached cover thumbnails
+register_image_routes(app.server)
+
+# JSON API for filtering shows by market
+register_market_routes(app.server, get_catalog)
+
+# Per-callback latency: Server-Timing headers and rolling percentiles at /metrics
+register_metrics(app.server)
+
+READY_AT = time.perf_counter()
+print(f"App initialised in {READY_AT - STARTED_AT:.2f}s")
+
+# Report time-to-first-response once per worker, so cold starts can be tracked across deploys
+_first_response_reported = False
+
+@app.server.after_request
+def report_time_to_first_response(response):
+    global _first_response_reported
+    if not _first_response_reported:
+        _first_response_reported = True
+        print(
+            f"Time to first response: {time.perf_counter() - STARTED_AT:.2f}s "
+            f"(initialisation {READY_AT - STARTED_AT:.2f}s)"
+        )
+    return response
+
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,102 @@
+// Clientside callbacks: presentation-only work that does not need a server round trip
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    details: {
+        // Mirrors Python's colorsys.rgb_to_hls / hls_to_rgb
+        rgbToHls: function (r, g, b) {
+            const maxc = Math.max(r, g, b);
+            const minc = Math.min(r, g, b);
+            const sumc = maxc + minc;
+            const rangec = maxc - minc;
+            const l = sumc / 2.0;
+            if (minc === maxc) {
+                return [0.0, l, 0.0];
+            }
+            const s = l <= 0.5 ? rangec / sumc : rangec / (2.0 - maxc - minc);
+            const rc = (maxc - r) / rangec;
+            const gc = (maxc - g) / rangec;
+            const bc = (maxc - b) / rangec;
+            let h;
+            if (r === maxc) {
+                h = bc - gc;
+            } else if (g === maxc) {
+                h = 2.0 + rc - bc;
+            } else {
+                h = 4.0 + gc - rc;
+            }
+            h = ((h / 6.0) % 1.0 + 1.0) % 1.0;
+            return [h, l, s];
+        },
+
+        hlsToRgb: function (h, l, s) {
+            if (s === 0.0) {
+                return [l, l, l];
+            }
+            const m2 = l <= 0.5 ? l * (1.0 + s) : l + s - (l * s);
+            const m1 = 2.0 * l - m2;
+            const v = function (hue) {
+                hue = ((hue % 1.0) + 1.0) % 1.0;
+                if (hue < 1.0 / 6.0) {
+                    return m1 + (m2 - m1) * hue * 6.0;
+                }
+                if (hue < 0.5) {
+                    return m2;
+                }
+                if (hue < 2.0 / 3.0) {
+                    return m1 + (m2 - m1) * (2.0 / 3.0 - hue) * 6.0;
+                }
+                return m1;
+            };
+            return [v(h + 1.0 / 3.0), v(h), v(h - 1.0 / 3.0)];
+        },
+
+        // Lighten colors that are too dark to be visible on the dark panel
+        ensureContrast: function (color) {
+            const hls = window.dash_clientside.details.rgbToHls(color[0] / 255.0, color[1] / 255.0, color[2] / 255.0);
+            let l = hls[1];
+            if (l < 0.3) {
+                l += 0.3;
+            }
+            const rgb = window.dash_clientside.details.hlsToRgb(hls[0], l, hls[2]);
+            return "rgb(" + rgb.map(function (c) { return Math.trunc(c * 255); }).join(", ") + ")";
+        },
+
+        panelStyles: function (palette) {
+            const containerStyle = {
+                width: "400px",
+                backgroundColor: "#282828",
+                borderRadius: "15px",
+                padding: "20px",
+                overflowY: "auto",
+                boxShadow: "0 10px 20px rgba(0,0,0,0.2)",
+                border: "2px solid #282828",
+                transition: "all 0.5s ease-in-out",
+            };
+            const placeholderStyle = {color: "#B3B3B3", textAlign: "center"};
+            const bodyStyle = {
+                display: "flex",
+                flexDirection: "column",
+                alignItems: "center",
+                textAlign: "center",
+            };
+
+            if (!palette || !palette.selected) {
+                return [containerStyle, placeholderStyle, {display: "none"}];
+            }
+
+            let borderColor = "#1DB954";
+            let shadowColor = "rgba(29, 185, 84, 0.3)";
+            if (palette.color) {
+                borderColor = window.dash_clientside.details.ensureContrast(palette.color);
+                shadowColor = borderColor;
+            }
+            return [
+                Object.assign({}, containerStyle, {
+                    boxShadow: "0 10px 20px " + shadowColor,
+                    border: "2px solid " + borderColor,
+                }),
+                {display: "none"},
+                bodyStyle,
+            ];
+        },
+    },
+});
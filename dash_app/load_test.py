@@ -0,0 +1,99 @@
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# Outputs of the details callback, in the order pages/main.py declares them
+DETAILS_OUTPUTS = [
+    ("details-image", "src"),
+    ("details-name", "children"),
+    ("details-publisher", "children"),
+    ("details-description", "children"),
+    ("details-episodes", "children"),
+    ("details-stats", "children"),
+    ("details-category", "children"),
+    ("details-link", "href"),
+    ("details-palette", "data"),
+]
+
+def selection_payload(show_id):
+    """Payload the browser sends when a podcast is picked in the dropdown."""
+    return {
+        "output": "..%s.." % "...".join(f"{component}.{prop}" for component, prop in DETAILS_OUTPUTS),
+        "outputs": [{"id": component, "property": prop} for component, prop in DETAILS_OUTPUTS],
+        "inputs": [{"id": "podcast-dropdown", "property": "value", "value": show_id}],
+        "changedPropIds": ["podcast-dropdown.value"],
+        "state": [],
+    }
+
+def parse_server_timing(header):
+    """Turn a Server-Timing header into a {name: milliseconds} dictionary."""
+    timings = {}
+    for entry in (header or "").split(","):
+        parts = [part.strip() for part in entry.split(";")]
+        for part in parts[1:]:
+            if part.startswith("dur="):
+                timings[parts[0]] = timings.get(parts[0], 0.0) + float(part[4:])
+    return timings
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+def replay_selections(base_url, show_ids, requests_count, concurrency, seed=None):
+    """
+    Replay random dropdown selections against a running app and collect
+    client-side latencies plus the server's Server-Timing breakdown.
+    """
+    rng = random.Random(seed)
+    selections = [rng.choice(show_ids) for _ in range(requests_count)]
+    session = requests.Session()
+    url = f"{base_url}/_dash-update-component"
+
+    def select(show_id):
+        start = time.perf_counter()
+        response = session.post(url, json=selection_payload(show_id), timeout=60)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return response.status_code, elapsed_ms, parse_server_timing(response.headers.get("Server-Timing"))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(select, selections))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay podcast dropdown selections against the Dash app.")
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="Base URL of the running app")
+    parser.add_argument("--requests", type=int, default=500, help="Number of selections to replay")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--market", help="Only select shows available in this market")
+    parser.add_argument("--seed", type=int, help="Random seed, for reproducible runs")
+    args = parser.parse_args()
+
+    params = {"market": args.market} if args.market else {}
+    show_ids = [show["id"] for show in requests.get(f"{args.url}/api/shows", params=params, timeout=30).json()]
+    print(f"Replaying {args.requests} selections over {len(show_ids)} shows with {args.concurrency} clients...")
+
+    started = time.perf_counter()
+    results = replay_selections(args.url, show_ids, args.requests, args.concurrency, args.seed)
+    wall_seconds = time.perf_counter() - started
+
+    errors = sum(1 for status, _, _ in results if status != 200)
+    latencies = [elapsed for _, elapsed, _ in results]
+    print(f"\n{len(results)} requests in {wall_seconds:.2f}s ({len(results) / wall_seconds:.1f} req/s), {errors} errors")
+    print(f"Client latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} "
+          f"p99={percentile(latencies, 99):.1f}")
+
+    stages = sorted({stage for _, _, timings in results for stage in timings})
+    for stage in stages:
+        samples = [timings[stage] for _, _, timings in results if stage in timings]
+        print(f"Server {stage:<10} ms: p50={percentile(samples, 50):.2f} p95={percentile(samples, 95):.2f} "
+              f"p99={percentile(samples, 99):.2f} (n={len(samples)})")
+
+    print("\nServer /metrics:")
+    for name, summary in requests.get(f"{args.url}/metrics", timeout=30).json().items():
+        print(f"  {name}: {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,37 @@
-from dash import html, dcc, Input, Output, State, callback
+from dash import html, dcc, Input, Output, State, ALL, callback, clientside_callback, ClientsideFunction, ctx
 import dash
 import pandas as pd
-import requests
-from io import BytesIO
-from colorthief import ColorThief
-from colorsys import rgb_to_hls, hls_to_rgb
+from utils.cache import memoize_callback, skip_cache
+from utils.catalog import database_version, get_snapshot
+from utils.images import dominant_color, thumbnail_url
+from utils.markets import market_mask
+from utils.search import search, HIGHLIGHT_START, HIGHLIGHT_END
+from utils.timeline import show_timeline
+from utils.metrics import timed
 
 dash.register_page(__name__, path="/main")
 
-# Load the podcast data
-podcast_data = pd.read_csv("podcast_details.csv")  # Replace with the actual path to your CSV
+# Load the podcast data, indexed by show ID, from the prebuilt catalog snapshot
+catalog_snapshot = get_snapshot()
+podcast_data = catalog_snapshot["catalog"]
+podcast_options = catalog_snapshot["options"]
+CATALOG_VERSION = catalog_snapshot["version"]
 
-# Extract relevant fields
-podcast_options = sorted(
-    [{"label": row["name"], "value": row["name"]} for _, row in podcast_data.iterrows()],
-    key=lambda x: x["label"]
-)
+# Catalog row of each dropdown option, used to filter options by market
+option_rows = podcast_data.index.get_indexer([option["value"] for option in podcast_options])
+market_options = [{"label": market, "value": market} for market in podcast_data.attrs["market_table"]]
 
-# Function to get dominant colors from an image
-def get_dominant_colors(image_url, num_colors=3):
-    response = requests.get(image_url)
-    image = BytesIO(response.content)
-    color_thief = ColorThief(image)
-    palette = color_thief.get_palette(color_count=num_colors)
-    return [f"rgb({r}, {g}, {b})" for r, g, b in palette]
+# Render a search snippet, turning the highlight markers into <mark> elements
+def render_snippet(snippet):
+    children = []
+    for i, part in enumerate((snippet or "").split(HIGHLIGHT_START)):
+        if i == 0:
+            children.append(part)
+            continue
+        highlighted, _, rest = part.partition(HIGHLIGHT_END)
+        children.append(html.Mark(highlighted, style={'backgroundColor': '#1DB954', 'color': 'black'}))
+        children.append(rest)
+    return children
 
 # Custom CSS for more advanced styling
 app_css = {
@@ -61,21 +69,41 @@ layout = html.Div(
                         'height': 'auto',
                     }
                 ),
-                # Dropdown on the right
-                dcc.Dropdown(
-                    id="podcast-dropdown",
-                    options=podcast_options,
-                    placeholder="Search for a podcast...",
-                    style={
-                        'width': '300px',
-                        'height': '50px',
-                        'backgroundColor': '#282828',
-                        'color': '#1DB954',
-                        'borderRadius': '20px',
-                        'textAlign': 'left',
-                    },
-                    optionHeight=50,
-                    className='custom-dropdown',
+                # Dropdowns on the right
+                html.Div(
+                    style={'display': 'flex', 'gap': '10px'},
+                    children=[
+                        dcc.Dropdown(
+                            id="market-dropdown",
+                            options=market_options,
+                            placeholder="Market",
+                            style={
+                                'width': '120px',
+                                'height': '50px',
+                                'backgroundColor': '#282828',
+                                'color': '#1DB954',
+                                'borderRadius': '20px',
+                                'textAlign': 'left',
+                            },
+                            optionHeight=50,
+                            className='custom-dropdown',
+                        ),
+                        dcc.Dropdown(
+                            id="podcast-dropdown",
+                            options=podcast_options,
+                            placeholder="Search for a podcast...",
+                            style={
+                                'width': '300px',
+                                'height': '50px',
+                                'backgroundColor': '#282828',
+                                'color': '#1DB954',
+                                'borderRadius': '20px',
+                                'textAlign': 'left',
+                            },
+                            optionHeight=50,
+                            className='custom-dropdown',
+                        ),
+                    ]
                 ),
             ]
         ),
@@ -101,152 +129,396 @@ layout = html.Div(
                         'boxShadow': '0 10px 20px rgba(0,0,0,0.2)',
                     },
                     children=[
+                        # Cover color of the selected show; the panel styling is derived in the browser
+                        dcc.Store(id="details-palette", data={"selected": False, "color": None}),
                         html.Div(
                             id="podcast-details",
                             style={
                                 'textAlign': 'center',
-                            }
+                            },
+                            children=[
+                                html.Div(
+                                    "Select a podcast to view details.",
+                                    id="details-placeholder",
+                                    style={'color': '#B3B3B3', 'textAlign': 'center'}
+                                ),
+                                html.Div(
+                                    id="details-body",
+                                    style={'display': 'none'},
+                                    children=[
+                                        html.Img(
+                                            id="details-image",
+                                            style={
+                                                'width': '250px',
+                                                'height': '250px',
+                                                'objectFit': 'cover',
+                                                'borderRadius': '15px',
+                                                'marginBottom': '20px',
+                                                'boxShadow': '0 10px 20px rgba(0,0,0,0.3)',
+                                            },
+                                        ),
+                                        html.H3(
+                                            id="details-name",
+                                            style={
+                                                'color': '#1DB954',
+                                                'marginBottom': '10px',
+                                                'fontSize': '1.5rem',
+                                            }
+                                        ),
+                                        html.P(id="details-publisher", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
+                                        html.P(id="details-description", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
+                                        html.P(id="details-episodes", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
+                                        html.P(id="details-stats", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
+                                        html.P(id="details-category", style={'color': '#B3B3B3', 'marginBottom': '20px'}),
+                                        html.Div(
+                                            children=[
+                                                dcc.Link(
+                                                    "Listen on Spotify",
+                                                    id="details-link",
+                                                    href="",
+                                                    target="_blank",
+                                                    style={
+                                                        'backgroundColor': '#1DB954',
+                                                        'color': 'white',
+                                                        'padding': '10px 20px',
+                                                        'borderRadius': '25px',
+                                                        'textDecoration': 'none',
+                                                        'fontWeight': 'bold',
+                                                        'transition': 'transform 0.2s',
+                                                        'display': 'inline-block',
+                                                    },
+                                                    className='click-button'
+                                                ),
+                                                html.Button(
+                                                    "+",
+                                                    id="add-to-plot",
+                                                    style={
+                                                        'marginLeft': '10px',
+                                                        'backgroundColor': '#1DB954',
+                                                        'border': 'none',
+                                                        'borderRadius': '25px',
+                                                        'color': 'white',
+                                                        'fontWeight': 'bold',
+                                                        'padding': '10px 15px',
+                                                        'cursor': 'pointer',
+                                                        'transition': 'all 0.3s ease',
+                                                    },
+                                                    className="click-button"
+                                                )
+                                            ],
+                                            style={'display': 'flex', 'justifyContent': 'center', 'gap': '10px'}
+                                        )
+                                    ]
+                                ),
+                            ]
                         )
                     ]
+                ),
+
+                # Episode Timeline Comparison Column
+                html.Div(
+                    style={
+                        'flex': '1',
+                        'minWidth': '0',
+                        'backgroundColor': '#282828',
+                        'borderRadius': '15px',
+                        'padding': '20px',
+                        'display': 'flex',
+                        'flexDirection': 'column',
+                        'boxShadow': '0 10px 20px rgba(0,0,0,0.2)',
+                    },
+                    children=[
+                        dcc.Store(id="plot-shows", data=[]),
+                        html.Div(
+                            style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center'},
+                            children=[
+                                html.H4("Episode Timelines", style={'color': '#1DB954', 'margin': '0'}),
+                                html.Button(
+                                    "Clear",
+                                    id="clear-plot",
+                                    style={
+                                        'backgroundColor': '#1DB954',
+                                        'border': 'none',
+                                        'borderRadius': '25px',
+                                        'color': 'white',
+                                        'fontWeight': 'bold',
+                                        'padding': '8px 15px',
+                                        'cursor': 'pointer',
+                                    },
+                                    className="click-button"
+                                ),
+                            ]
+                        ),
+                        dcc.Graph(
+                            id="timeline-graph",
+                            config={'displaylogo': False},
+                            style={'flex': '1', 'minHeight': '0'},
+                        ),
+                    ]
+                ),
+
+                # Search Column
+                html.Div(
+                    style={
+                        'width': '400px',
+                        'backgroundColor': '#282828',
+                        'borderRadius': '15px',
+                        'padding': '20px',
+                        'overflowY': 'auto',
+                        'boxShadow': '0 10px 20px rgba(0,0,0,0.2)',
+                    },
+                    children=[
+                        dcc.Input(
+                            id="search-input",
+                            type="search",
+                            placeholder='Search shows and episodes, "quoted phrases" work too...',
+                            debounce=True,
+                            style={
+                                'width': '100%',
+                                'height': '40px',
+                                'backgroundColor': '#121212',
+                                'color': 'white',
+                                'border': '1px solid #1DB954',
+                                'borderRadius': '20px',
+                                'padding': '0 15px',
+                                'boxSizing': 'border-box',
+                                'marginBottom': '15px',
+                            },
+                        ),
+                        html.Div(id="search-results"),
+                    ]
                 )
             ]
         )
     ]
 )
 
-# Callback to update podcast details
+# Callback to run a full-text search over shows and episodes
 @callback(
-    [Output("podcast-details", "children"), Output("podcast-details-container", "style")],
-    Input("podcast-dropdown", "value"),
+    Output("search-results", "children"),
+    Input("search-input", "value"),
 )
-def update_podcast_details(selected_podcast):
-    default_style = {
-        'width': '400px',
-        'backgroundColor': '#282828',  # Static background
-        'borderRadius': '15px',
-        'padding': '20px',
-        'overflowY': 'auto',
-        'boxShadow': '0 10px 20px rgba(0,0,0,0.2)',
-        'border': '2px solid #282828',  # Default border
-        'transition': 'all 0.5s ease-in-out',
+def update_search_results(query):
+    if not query or not query.strip():
+        return []
+
+    with timed("search"):
+        shows, episodes = search(query)
+    if not shows and not episodes:
+        return html.P("No matches found.", style={'color': '#B3B3B3'})
+
+    result_style = {
+        'padding': '10px',
+        'marginBottom': '8px',
+        'borderRadius': '10px',
+        'backgroundColor': '#181818',
+        'cursor': 'pointer',
     }
-    
-    if not selected_podcast:
-        return (
+    results = []
+    if shows:
+        results.append(html.H4("Shows", style={'color': '#1DB954', 'margin': '5px 0 10px'}))
+        results.extend(
             html.Div(
-                "Select a podcast to view details.",
-                style={'color': '#B3B3B3', 'textAlign': 'center'}
-            ),
-            default_style
+                id={"type": "search-result", "index": f"show-{i}-{show['show_id']}"},
+                n_clicks=0,
+                style=result_style,
+                children=[
+                    html.Div(show["show_name"], style={'fontWeight': 'bold'}),
+                    html.Div(render_snippet(show["snippet"]), style={'color': '#B3B3B3', 'fontSize': '0.85rem'}),
+                ],
+            )
+            for i, show in enumerate(shows)
         )
-    
-    # Fetch podcast details
-    podcast = podcast_data[podcast_data["name"] == selected_podcast].iloc[0]
-    image_url = podcast["image_url"]
-
-    # Try extracting dominant colors, fallback if needed
-    try:
-        colors = get_dominant_colors(image_url)
-        border_color = colors[0]
-        shadow_color = colors[0]
-
-    except Exception:
-        # Fallback colors (Spotify green gradient)
-        border_color = "#1DB954"
-        shadow_color = "rgba(29, 185, 84, 0.3)"
-
-    # Ensure colors are lightened if too dark for visibility
-    def ensure_contrast(rgb_color):
-        r, g, b = [x / 255.0 for x in rgb_color]
-        h, l, s = rgb_to_hls(r, g, b)
-        if l < 0.3:  # If luminance is too low
-            l += 0.3
-        r, g, b = hls_to_rgb(h, l, s)
-        return f"rgb({int(r * 255)}, {int(g * 255)}, {int(b * 255)})"
-
-    try:
-        border_color = ensure_contrast(tuple(int(c) for c in border_color[4:-1].split(", ")))
-        shadow_color = ensure_contrast(tuple(int(c) for c in shadow_color[4:-1].split(", ")))
-    except:
-        pass  # Keep fallback colors if processing fails
-
-    # Details content
-    details = html.Div(
-        children=[
-            html.Img(
-                src=podcast["image_url"],
-                style={
-                    'width': '250px',
-                    'height': '250px',
-                    'objectFit': 'cover',
-                    'borderRadius': '15px',
-                    'marginBottom': '20px',
-                    'boxShadow': '0 10px 20px rgba(0,0,0,0.3)',
-                },
-            ),
-            html.H3(
-                podcast["name"], 
-                style={
-                    'color': '#1DB954', 
-                    'marginBottom': '10px',
-                    'fontSize': '1.5rem',
-                }
-            ),
-            html.P(f"Publisher: {podcast['publisher']}", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
-            html.P(f"{podcast['description']}", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
-            html.P(f"Total Episodes: {podcast['total_episodes']}", style={'color': '#B3B3B3', 'marginBottom': '10px'}),
-            html.P(f"Category: {podcast['category']}", style={'color': '#B3B3B3', 'marginBottom': '20px'}),
+    if episodes:
+        results.append(html.H4("Episodes", style={'color': '#1DB954', 'margin': '15px 0 10px'}))
+        results.extend(
             html.Div(
+                id={"type": "search-result", "index": f"episode-{i}-{episode['show_id']}"},
+                n_clicks=0,
+                style=result_style,
                 children=[
-                    dcc.Link(
-                        "Listen on Spotify",
-                        href=podcast["external_url"],
-                        target="_blank",
-                        style={
-                            'backgroundColor': '#1DB954',
-                            'color': 'white',
-                            'padding': '10px 20px',
-                            'borderRadius': '25px',
-                            'textDecoration': 'none',
-                            'fontWeight': 'bold',
-                            'transition': 'transform 0.2s',
-                            'display': 'inline-block',
-                        },
-                        className='click-button'
+                    html.Div(episode["episode_name"], style={'fontWeight': 'bold'}),
+                    html.Div(
+                        f"{episode['show_name'] or 'Unknown show'} · {episode['release_date']}",
+                        style={'color': '#1DB954', 'fontSize': '0.8rem'}
                     ),
-                    html.Button(
-                        "+",
-                        id="add-to-plot",
-                        style={
-                            'marginLeft': '10px',
-                            'backgroundColor': '#1DB954',
-                            'border': 'none',
-                            'borderRadius': '25px',
-                            'color': 'white',
-                            'fontWeight': 'bold',
-                            'padding': '10px 15px',
-                            'cursor': 'pointer',
-                            'transition': 'all 0.3s ease',
-                        },
-                        className="click-button"
-                    )
+                    html.Div(render_snippet(episode["snippet"]), style={'color': '#B3B3B3', 'fontSize': '0.85rem'}),
                 ],
-                style={'display': 'flex', 'justifyContent': 'center', 'gap': '10px'}
             )
-        ],
-        style={
-            'display': 'flex',
-            'flexDirection': 'column',
-            'alignItems': 'center',
-            'textAlign': 'center',
-        }
-    )
-    
-    # Update container style with dynamic border and shadow
-    container_style = {
-        **default_style,
-        'boxShadow': f"0 10px 20px {shadow_color}",  # Dynamic shadow
-        'border': f"2px solid {border_color}",  # Dynamic border color
+            for i, episode in enumerate(episodes)
+        )
+    return results
+
+# Callback to open the show behind a clicked search result
+@callback(
+    Output("podcast-dropdown", "value"),
+    Input({"type": "search-result", "index": ALL}, "n_clicks"),
+    prevent_initial_call=True,
+)
+def select_search_result(n_clicks):
+    if not ctx.triggered_id or not any(n_clicks):
+        return dash.no_update
+    # Search reads the live database, which may hold shows this worker's snapshot predates
+    show_id = ctx.triggered_id["index"].rsplit("-", 1)[-1]
+    if show_id not in podcast_data.index:
+        return dash.no_update
+    return show_id
+
+# Callback to add the selected show to the timeline comparison
+@callback(
+    Output("plot-shows", "data"),
+    Input("add-to-plot", "n_clicks"),
+    State("podcast-dropdown", "value"),
+    State("plot-shows", "data"),
+    prevent_initial_call=True,
+)
+def add_show_to_plot(n_clicks, selected_podcast, plot_shows):
+    if not n_clicks or not selected_podcast or selected_podcast in plot_shows:
+        return dash.no_update
+    return plot_shows + [selected_podcast]
+
+# Callback to empty the timeline comparison
+@callback(
+    Output("plot-shows", "data", allow_duplicate=True),
+    Input("clear-plot", "n_clicks"),
+    prevent_initial_call=True,
+)
+def clear_plot(n_clicks):
+    return []
+
+# Callback to draw the episode release timelines of the compared shows
+@callback(
+    Output("timeline-graph", "figure"),
+    Input("plot-shows", "data"),
+)
+def update_timeline_graph(plot_shows):
+    # Episodes live in the database, which may have changed since this worker started
+    version = database_version() if plot_shows else None
+    traces = []
+    missing = []
+    for show_id in plot_shows or []:
+        name = podcast_data.loc[show_id, "name"] if show_id in podcast_data.index else show_id
+        if version is None:
+            missing.append(name)
+            continue
+        try:
+            with timed("timeline"):
+                timeline = show_timeline(show_id, version)
+        except Exception as e:
+            print(f"Error loading episodes for show {show_id}: {e}")
+            missing.append(name)
+            continue
+        if not timeline['episodes']:
+            missing.append(name)
+            continue
+        traces.append({
+            'type': 'scattergl',
+            'mode': 'markers+lines',
+            'name': f"{name} ({timeline['episodes']} eps, median {timeline['median_minutes']} min)",
+            'x': timeline['x'],
+            'y': timeline['y'],
+            'line': {'width': 1},
+            'marker': {'size': 4},
+            'hovertemplate': '%{x}<br>%{y} min<extra>' + str(name) + '</extra>',
+        })
+
+    return {
+        'data': traces,
+        'layout': {
+            'paper_bgcolor': '#282828',
+            'plot_bgcolor': '#181818',
+            'font': {'color': '#B3B3B3'},
+            'margin': {'l': 50, 'r': 20, 't': 20, 'b': 40},
+            'xaxis': {'title': 'Release date', 'gridcolor': '#333333'},
+            'yaxis': {'title': 'Duration (min)', 'gridcolor': '#333333'},
+            'legend': {'orientation': 'h', 'y': -0.2},
+            'annotations': [] if traces and not missing else [{
+                'text': (
+                    f"No episode data available for {', '.join(map(str, missing))}."
+                    if missing else 'Select a podcast and press + to compare episode timelines.'
+                ),
+                'showarrow': False,
+                'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 1.0 if traces else 0.5,
+                'yanchor': 'bottom' if traces else 'middle',
+            }],
+        },
     }
 
-    return details, container_style
+# Callback to restrict the podcast dropdown to shows available in the chosen market
+@callback(
+    Output("podcast-dropdown", "options"),
+    Input("market-dropdown", "value"),
+)
+def filter_podcast_options(selected_market):
+    if not selected_market:
+        return podcast_options
+    available = market_mask(podcast_data, selected_market)[option_rows]
+    return [option for option, keep in zip(podcast_options, available) if keep]
+
+# Callback to fill in the details of the selected podcast. Only data is
+# returned; the panel's colors are computed clientside from details-palette.
+@callback(
+    Output("details-image", "src"),
+    Output("details-name", "children"),
+    Output("details-publisher", "children"),
+    Output("details-description", "children"),
+    Output("details-episodes", "children"),
+    Output("details-stats", "children"),
+    Output("details-category", "children"),
+    Output("details-link", "href"),
+    Output("details-palette", "data"),
+    Input("podcast-dropdown", "value"),
+)
+# Schema 2: eight data fields and the palette, instead of a rendered Div and a style
+@memoize_callback(
+    key=lambda show_id: (show_id, CATALOG_VERSION) if show_id in podcast_data.index else None,
+    schema=2,
+)
+def update_podcast_details(selected_podcast):
+    if not selected_podcast or selected_podcast not in podcast_data.index:
+        return None, "", "", "", "", "", "", "", {"selected": False, "color": None}
+
+    # Fetch podcast details
+    with timed("catalog"):
+        podcast = podcast_data.loc[selected_podcast]
+
+    # Cover color shipped with the catalog snapshot, extracted now for covers not seen yet
+    color = podcast.get("palette")
+    if not isinstance(color, tuple):
+        try:
+            color = dominant_color(podcast["image_url"])
+        except Exception:
+            color = None  # The panel falls back to Spotify green
+            skip_cache()  # Retry the extraction on the next selection
+
+    # Episode statistics, present once spotify_api/episode_stats.py has run
+    episode_stats = []
+    if pd.notna(podcast.get("median_duration_ms")):
+        episode_stats.append(f"Median Episode: {podcast['median_duration_ms'] / 60000:.0f} min")
+    if pd.notna(podcast.get("episodes_per_month")):
+        episode_stats.append(f"{podcast['episodes_per_month']:.1f} episodes/month")
+
+    # The only remote fetch of a cold selection once the palette ships with the snapshot
+    with timed("cover"):
+        image_src = thumbnail_url(podcast["image_url"], 250)
+
+    return (
+        image_src,
+        podcast["name"],
+        f"Publisher: {podcast['publisher']}",
+        f"{podcast['description']}",
+        f"Total Episodes: {podcast['total_episodes']}",
+        " · ".join(episode_stats),
+        f"Category: {podcast['category']}",
+        podcast["external_url"],
+        {"selected": True, "color": list(color) if color else None},
+    )
+
+# Panel border, shadow and visibility, computed in the browser (assets/clientside.js)
+clientside_callback(
+    ClientsideFunction(namespace="details", function_name="panelStyles"),
+    Output("podcast-details-container", "style"),
+    Output("details-placeholder", "style"),
+    Output("details-body", "style"),
+    Input("details-palette", "data"),
+)
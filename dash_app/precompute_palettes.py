@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+from utils.catalog import load_catalog
+from utils.images import cached_dominant_color, dominant_color
+
+def precompute_palettes(max_workers=8):
+    """
+    Fetch every cover in the catalog and extract its dominant color ahead of
+    time, so the next catalog snapshot ships colors for all shows.
+    """
+    catalog = load_catalog()
+    image_urls = [
+        url for url in catalog["image_url"].dropna().unique()
+        if cached_dominant_color(url) is None
+    ]
+    print(f"Extracting cover colors for {len(image_urls)} shows...")
+
+    def extract(image_url):
+        try:
+            dominant_color(image_url)
+            return True
+        except Exception as e:
+            print(f"Error extracting color for {image_url}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        extracted = sum(executor.map(extract, image_urls))
+    print(f"Extracted {extracted} of {len(image_urls)} cover colors")
+
+if __name__ == "__main__":
+    precompute_palettes()
@@ -0,0 +1,172 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Directory holding the on-disk cache store shared by all workers on this host
+CACHE_DIR = os.getenv("DASH_CACHE_DIR", ".cache")
+
+_MISSING = object()
+_call_state = threading.local()
+
+class LRUCache:
+    """
+    Thread-safe in-process cache that evicts the least recently used entry
+    once `maxsize` entries are held.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SharedStore:
+    """
+    SQLite-backed key/value store used as a second cache level, so workers
+    on the same host reuse each other's results. Values are pickled and the
+    least recently used rows are dropped once `max_entries` is exceeded.
+    """
+    def __init__(self, path, max_entries=4096):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return pickle.loads(row[0])
+        except Exception as e:
+            print(f"Error reading cache entry '{key}': {e}")
+            return default
+
+    def set(self, key, value):
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM entries WHERE key NOT IN "
+                "(SELECT key FROM entries ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        except Exception as e:
+            print(f"Error writing cache entry '{key}': {e}")
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+_shared_store = None
+
+def get_shared_store():
+    """Return the process-wide shared store, creating it on first use."""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = SharedStore(os.path.join(CACHE_DIR, "callbacks.sqlite"))
+    return _shared_store
+
+def skip_cache():
+    """
+    Keep the result of the memoized call in progress out of both cache
+    levels, e.g. because it was built from a fallback after a transient error.
+    """
+    _call_state.skip = True
+
+def memoize_callback(key, maxsize=256, shared=True, schema=1):
+    """
+    Memoize a Dash callback on the value returned by `key(*args)`.
+
+    `schema` is part of every key in the shared store, which outlives
+    deploys: bump it whenever the shape of the function's result changes
+    so entries written by older code are never returned.
+
+    Results are looked up in a bounded in-process LRU first and then in the
+    shared on-disk store. When `key` returns None the callback runs uncached,
+    which is how empty selections and other cheap paths opt out. Calling
+    skip_cache() during the call leaves a degraded result uncached.
+    """
+    def decorator(func):
+        namespace = f"{func.__module__}.{func.__qualname__}@{schema}"
+        local = LRUCache(maxsize)
+
+        @wraps(func)
+        def wrapper(*args):
+            cache_key = key(*args)
+            if cache_key is None:
+                return func(*args)
+
+            result = local.get(cache_key, _MISSING)
+            if result is not _MISSING:
+                return result
+
+            store_key = f"{namespace}:{cache_key!r}"
+            store = get_shared_store() if shared else None
+            if store is not None:
+                result = store.get(store_key, _MISSING)
+                if result is not _MISSING:
+                    local.set(cache_key, result)
+                    return result
+
+            outer_skip = getattr(_call_state, "skip", False)
+            _call_state.skip = False
+            try:
+                result = func(*args)
+                skipped = _call_state.skip
+            finally:
+                _call_state.skip = outer_skip
+            if skipped:
+                return result
+
+            local.set(cache_key, result)
+            if store is not None:
+                store.set(store_key, result)
+            return result
+
+        wrapper.cache = local
+        return wrapper
+    return decorator
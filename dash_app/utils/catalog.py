@@ -0,0 +1,181 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+# Imported eagerly: the snapshot holds a DataFrame, so unpickling it needs pandas anyway
+import pandas as pd
+from contextlib import closing
+from functools import lru_cache
+from utils.cache import CACHE_DIR
+from utils.images import PALETTE_DIR, cached_dominant_color
+from utils.markets import encode_markets, market_columns, MARKET_COLUMN_PREFIX
+
+# Path to the podcast details produced by spotify_api/fetch_podcast_details.py
+CATALOG_PATH = "podcast_details.csv"
+# Catalog database built by spotify_api/catalog_db.py; preferred over the CSV once it has been imported into
+CATALOG_DB = os.getenv("CATALOG_DB", "catalog.sqlite")
+# Binary snapshot of the columns the UI needs, rebuilt whenever the source changes
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, "catalog_snapshot.pkl")
+
+UI_COLUMNS = [
+    "id", "name", "description", "publisher", "total_episodes", "category",
+    "external_url", "image_url", "median_duration_ms", "episodes_per_month", "palette",
+]
+
+SHOWS_QUERY = """
+SELECT s.id, s.name, s.description, s.html_description, s.publisher, s.languages,
+       s.media_type, s.total_episodes, s.is_externally_hosted, s.explicit,
+       s.external_url, s.image_url, s.uri, s.href, g.name AS category, s.original_image_url,
+       (SELECT group_concat(m.code) FROM show_markets sm
+        JOIN markets m ON m.id = sm.market_id
+        WHERE sm.show_id = s.id) AS available_markets
+FROM shows s
+LEFT JOIN genres g ON g.id = s.genre_id
+ORDER BY s.rowid
+"""
+
+# Per-show statistics written by spotify_api/episode_stats.py
+SHOW_STATS_QUERY = """
+SELECT show_id AS id, median_duration_ms, episodes_per_month, median_gap_days,
+       explicit_ratio, top_language
+FROM show_stats
+"""
+
+def _connect_readonly(db_path):
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+
+def database_version(db_path=CATALOG_DB):
+    """
+    Version recorded by the database importer, or None when there is no
+    database or it was never imported into. Every crawler entry point creates
+    an empty database on connect, and that must not hide the CSV.
+    """
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with closing(_connect_readonly(db_path)) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def catalog_version(path=CATALOG_PATH, db_path=CATALOG_DB):
+    """
+    Return a version string for the catalog: the version recorded by the
+    database importer, or a short content hash of the CSV. Every worker
+    reading the same data gets the same version, so it is safe to use in
+    shared cache keys.
+    """
+    version = database_version(db_path)
+    if version is not None:
+        return f"db-{version}"
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def load_catalog(path=CATALOG_PATH, db_path=CATALOG_DB):
+    """
+    Load the podcast catalog indexed by show ID, from the catalog database
+    once something was imported into it and from the CSV otherwise. Shows listed under several
+    genres keep their first chart entry. From the database, the per-show
+    episode statistics are joined in when they have been computed.
+
+    The `available_markets` strings are replaced by uint64 bitset columns
+    (markets_0, markets_1, ...) over the market table kept in
+    `catalog.attrs["market_table"]`.
+    """
+    if database_version(db_path) is not None:
+        with closing(_connect_readonly(db_path)) as conn:
+            catalog = pd.read_sql_query(SHOWS_QUERY, conn)
+            has_stats = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'show_stats'"
+            ).fetchone()
+            if has_stats:
+                catalog = catalog.merge(pd.read_sql_query(SHOW_STATS_QUERY, conn), on="id", how="left")
+    else:
+        catalog = pd.read_csv(path)
+    catalog = catalog.drop_duplicates(subset="id", keep="first")
+
+    market_table, bits = encode_markets(catalog.pop("available_markets"))
+    for word in range(bits.shape[1]):
+        catalog[f"{MARKET_COLUMN_PREFIX}{word}"] = bits[:, word]
+    catalog.attrs["market_table"] = market_table
+
+    return catalog.set_index("id", drop=False)
+
+def _source_signature(path, db_path):
+    """
+    Cheap fingerprint of the catalog source. The database's -wal file is
+    included because committed writes land there before a checkpoint, and
+    the palette directory because extracted colors ship with the snapshot.
+    """
+    sources = [db_path, f"{db_path}-wal"] if database_version(db_path) is not None else [path]
+    sources.append(PALETTE_DIR)
+    signature = []
+    for source in sources:
+        if os.path.exists(source):
+            stat = os.stat(source)
+            signature.append((os.path.abspath(source), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def build_snapshot(path=CATALOG_PATH, db_path=CATALOG_DB):
+    """
+    Load the catalog and keep only what the UI uses: the display columns,
+    the cover colors extracted so far, the market bitsets and the sorted
+    dropdown options.
+    """
+    catalog = load_catalog(path, db_path)
+    catalog["palette"] = [
+        cached_dominant_color(image_url) if isinstance(image_url, str) else None
+        for image_url in catalog["image_url"]
+    ]
+    catalog = catalog[[column for column in UI_COLUMNS if column in catalog.columns] + market_columns(catalog)]
+    options = sorted(
+        ({"label": name, "value": show_id} for show_id, name in zip(catalog["id"], catalog["name"])),
+        key=lambda x: x["label"]
+    )
+    return {
+        "signature": _source_signature(path, db_path),
+        "version": catalog_version(path, db_path),
+        "catalog": catalog,
+        "options": options,
+    }
+
+def load_snapshot(path=CATALOG_PATH, db_path=CATALOG_DB, snapshot_path=SNAPSHOT_PATH):
+    """
+    Return the catalog snapshot, reading the pickled copy when it was built
+    from the current source and regenerating it otherwise.
+    """
+    signature = _source_signature(path, db_path)
+    try:
+        with open(snapshot_path, "rb") as file:
+            snapshot = pickle.load(file)
+        if snapshot.get("signature") == signature:
+            return snapshot
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ignoring unreadable catalog snapshot {snapshot_path}: {e}")
+
+    snapshot = build_snapshot(path, db_path)
+    try:
+        os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+        tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except Exception as e:
+        print(f"Error writing catalog snapshot {snapshot_path}: {e}")
+    return snapshot
+
+@lru_cache(maxsize=1)
+def get_snapshot():
+    """Catalog snapshot shared by every page and route in this process."""
+    return load_snapshot()
+
+def get_catalog():
+    """Catalog shared by every page and route in this process."""
+    return get_snapshot()["catalog"]
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import re
+from io import BytesIO
+from flask import abort, send_from_directory
+from utils.cache import CACHE_DIR, skip_cache
+from utils.metrics import timed
+
+# Thumbnails are stored as <content hash>_<size>.webp under IMAGE_DIR
+IMAGE_DIR = os.path.join(CACHE_DIR, "images")
+THUMBNAIL_SIZES = (64, 250)
+THUMBNAIL_FORMAT = "webp"
+IMAGE_ROUTE = "/images"
+# Dominant color of each cover, extracted once from its 64px thumbnail
+PALETTE_DIR = os.path.join(IMAGE_DIR, "palettes")
+
+_FILENAME_PATTERN = re.compile(rf"^([0-9a-f]{{40}})_(\d+)\.{THUMBNAIL_FORMAT}$")
+
+def _url_key(image_url):
+    return hashlib.sha1(image_url.encode("utf-8")).hexdigest()
+
+def _url_ref_path(image_url):
+    """Path of the small file mapping a remote URL to the content hash of its image."""
+    return os.path.join(IMAGE_DIR, "urls", _url_key(image_url))
+
+def _thumbnail_path(content_hash, size):
+    return os.path.join(IMAGE_DIR, f"{content_hash}_{size}.{THUMBNAIL_FORMAT}")
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+def cache_cover(image_url):
+    """
+    Download a cover once and store a thumbnail for every size in
+    THUMBNAIL_SIZES. Returns the content hash naming the thumbnails.
+    """
+    ref_path = _url_ref_path(image_url)
+    try:
+        with open(ref_path, "r") as file:
+            content_hash = file.read().strip()
+        if all(os.path.exists(_thumbnail_path(content_hash, size)) for size in THUMBNAIL_SIZES):
+            return content_hash
+    except FileNotFoundError:
+        pass
+
+    # Deferred so that starting the app does not pay for requests and Pillow
+    import requests
+    from PIL import Image
+
+    response = requests.get(image_url, timeout=10)
+    response.raise_for_status()
+    content_hash = hashlib.sha1(response.content).hexdigest()
+
+    os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+    image = Image.open(BytesIO(response.content)).convert("RGB")
+    for size in THUMBNAIL_SIZES:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        thumbnail.save(buffer, format=THUMBNAIL_FORMAT, quality=85, method=6)
+        _write_atomic(_thumbnail_path(content_hash, size), buffer.getvalue())
+
+    _write_atomic(ref_path, content_hash.encode("utf-8"))
+    return content_hash
+
+def thumbnail_file(image_url, size):
+    """Local path of the cached thumbnail for `image_url`, fetching it if needed."""
+    return _thumbnail_path(cache_cover(image_url), size)
+
+def thumbnail_url(image_url, size=250):
+    """
+    URL of the locally served thumbnail for `image_url`. Falls back to the
+    remote URL if the cover cannot be fetched or converted, in which case a
+    memoized caller does not cache its result and retries on the next call.
+    """
+    try:
+        return f"{IMAGE_ROUTE}/{cache_cover(image_url)}_{size}.{THUMBNAIL_FORMAT}"
+    except Exception as e:
+        print(f"Error caching cover {image_url}: {e}")
+        skip_cache()
+        return image_url
+
+def cached_dominant_color(image_url):
+    """Dominant (r, g, b) color of a cover if it was already extracted, otherwise None."""
+    try:
+        with open(os.path.join(PALETTE_DIR, _url_key(image_url)), "r") as file:
+            return tuple(int(c) for c in file.read().split(","))
+    except (FileNotFoundError, ValueError):
+        return None
+
+def dominant_color(image_url):
+    """
+    Dominant (r, g, b) color of a cover. Extracted from the cached 64px
+    thumbnail on first use and stored next to it for every later request.
+    """
+    color = cached_dominant_color(image_url)
+    if color is not None:
+        return color
+
+    from colorthief import ColorThief  # Deferred: only needed for covers not seen before
+
+    with timed("cover"):
+        thumbnail = thumbnail_file(image_url, 64)
+    with timed("palette"):
+        color = tuple(ColorThief(thumbnail).get_palette(color_count=3)[0])
+
+    os.makedirs(PALETTE_DIR, exist_ok=True)
+    _write_atomic(os.path.join(PALETTE_DIR, _url_key(image_url)), ",".join(map(str, color)).encode("utf-8"))
+    return color
+
+def register_image_routes(server):
+    """Serve cached thumbnails from the Flask server behind the Dash app."""
+    @server.route(f"{IMAGE_ROUTE}/<filename>")
+    def serve_thumbnail(filename):
+        match = _FILENAME_PATTERN.match(filename)
+        if not match or int(match.group(2)) not in THUMBNAIL_SIZES:
+            abort(404)
+
+        # Names are content hashes, so a file never changes once written
+        response = send_from_directory(
+            os.path.abspath(IMAGE_DIR),
+            filename,
+            mimetype=f"image/{THUMBNAIL_FORMAT}",
+            max_age=365 * 24 * 3600,
+            etag=match.group(1),
+        )
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
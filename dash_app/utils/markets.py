@@ -0,0 +1,76 @@
+import numpy as np
+from flask import jsonify, request
+
+# Markets are stored as fixed-width bitsets: bit i of word i // 64 is set
+# when the show is available in market_table[i]
+WORD_BITS = 64
+MARKET_COLUMN_PREFIX = "markets_"
+
+def encode_markets(market_strings):
+    """
+    Encode comma-separated market lists as bitsets over an interned market table.
+
+    :param market_strings: Iterable of strings such as "AD,AE,AG"
+    :return: (market_table, bits) where market_table is a sorted tuple of
+             market codes and bits is a (rows, words) uint64 array
+    """
+    parsed = [
+        [code for code in str(markets).split(",") if code and code != "nan"]
+        for markets in market_strings
+    ]
+    market_table = tuple(sorted({code for codes in parsed for code in codes}))
+    positions = {code: i for i, code in enumerate(market_table)}
+    num_words = max(1, -(-len(market_table) // WORD_BITS))
+
+    bits = np.zeros((len(parsed), num_words), dtype=np.uint64)
+    for row, codes in enumerate(parsed):
+        for code in codes:
+            position = positions[code]
+            bits[row, position // WORD_BITS] |= np.uint64(1) << np.uint64(position % WORD_BITS)
+    return market_table, bits
+
+def market_columns(catalog):
+    """Names of the bitset word columns in the catalog, in word order."""
+    return [column for column in catalog.columns if column.startswith(MARKET_COLUMN_PREFIX)]
+
+def market_mask(catalog, market):
+    """
+    Boolean array selecting the catalog rows available in `market`.
+    Unknown markets select nothing.
+    """
+    market_table = catalog.attrs.get("market_table", ())
+    if market not in market_table:
+        return np.zeros(len(catalog), dtype=bool)
+    position = market_table.index(market)
+    words = catalog[f"{MARKET_COLUMN_PREFIX}{position // WORD_BITS}"].to_numpy(dtype=np.uint64)
+    return (words & (np.uint64(1) << np.uint64(position % WORD_BITS))) != 0
+
+def decode_markets(catalog, show_id):
+    """List of market codes a single show is available in."""
+    market_table = catalog.attrs.get("market_table", ())
+    words = catalog.loc[show_id, market_columns(catalog)].to_numpy(dtype=np.uint64)
+    return [
+        code for i, code in enumerate(market_table)
+        if int(words[i // WORD_BITS]) >> (i % WORD_BITS) & 1
+    ]
+
+def register_market_routes(server, get_catalog):
+    """
+    Expose the market filter over HTTP:
+      GET /api/markets            -> list of known market codes
+      GET /api/shows?market=US    -> shows available in that market
+    """
+    @server.route("/api/markets")
+    def list_markets():
+        return jsonify(list(get_catalog().attrs.get("market_table", ())))
+
+    @server.route("/api/shows")
+    def list_shows():
+        catalog = get_catalog()
+        market = request.args.get("market")
+        if market:
+            catalog = catalog[market_mask(catalog, market.upper())]
+        return jsonify([
+            {"id": show_id, "name": name, "category": category}
+            for show_id, name, category in zip(catalog["id"], catalog["name"], catalog["category"])
+        ])
@@ -0,0 +1,105 @@
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from flask import g, has_request_context, jsonify, request
+
+# Number of most recent samples kept per metric for the rolling percentiles
+WINDOW_SIZE = 2048
+PERCENTILES = (50, 95, 99)
+METRICS_ROUTE = "/metrics"
+
+_DASH_UPDATE_PATH = "_dash-update-component"
+_TOKEN_PATTERN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]+")
+
+class LatencyWindow:
+    """Rolling window of the latest latency samples of one metric, in milliseconds."""
+    def __init__(self, size=WINDOW_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, duration_ms):
+        self.samples.append(duration_ms)
+        self.count += 1
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {"count": self.count, "window": len(ordered)}
+        for percentile in PERCENTILES:
+            index = min(len(ordered) - 1, max(0, round(percentile / 100 * len(ordered)) - 1))
+            summary[f"p{percentile}"] = round(ordered[index], 3) if ordered else None
+        summary["max"] = round(ordered[-1], 3) if ordered else None
+        return summary
+
+_windows = {}
+_lock = threading.Lock()
+
+def record(name, duration_ms):
+    """Add one latency sample for `name` to its rolling window."""
+    with _lock:
+        window = _windows.get(name)
+        if window is None:
+            window = _windows[name] = LatencyWindow()
+        window.add(duration_ms)
+
+def snapshot():
+    """Percentile summary of every metric seen so far."""
+    with _lock:
+        return {name: window.summary() for name, window in sorted(_windows.items())}
+
+@contextmanager
+def timed(stage):
+    """
+    Time a sub-stage of a request. The duration goes into the rolling
+    window `stage:<name>` and, inside a request, into its Server-Timing header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        record(f"stage:{stage}", duration_ms)
+        if has_request_context():
+            g.setdefault("stage_timings", []).append((stage, duration_ms))
+
+def _callback_name():
+    """Outputs of the Dash callback handled by this request, which identify it."""
+    try:
+        return (request.get_json(silent=True) or {}).get("output", "unknown")
+    except Exception:
+        return "unknown"
+
+def _server_timing(name, duration_ms, description=None):
+    entry = f"{_TOKEN_PATTERN.sub('_', name)};dur={duration_ms:.2f}"
+    if description:
+        entry += f';desc="{description.replace(chr(34), "")}"'
+    return entry
+
+def register_metrics(server):
+    """
+    Time every Dash callback request and its stages, add a Server-Timing
+    header to the response and serve the rolling percentiles at /metrics.
+    """
+    @server.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @server.after_request
+    def add_server_timing(response):
+        started = g.get("request_started")
+        if started is None or not request.path.endswith(_DASH_UPDATE_PATH):
+            return response
+
+        total_ms = (time.perf_counter() - started) * 1000
+        callback_name = _callback_name()
+        record(f"callback:{callback_name}", total_ms)
+
+        entries = [_server_timing(stage, duration_ms) for stage, duration_ms in g.get("stage_timings", [])]
+        entries.append(_server_timing("total", total_ms, callback_name))
+        response.headers["Server-Timing"] = ", ".join(entries)
+        return response
+
+    @server.route(METRICS_ROUTE)
+    def metrics():
+        return jsonify(snapshot())
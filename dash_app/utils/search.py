@@ -0,0 +1,90 @@
+import re
+import threading
+from utils.catalog import CATALOG_DB, _connect_readonly
+
+# Markers placed around matched terms in snippets; rendered as highlights by the page
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\w+)', re.UNICODE)
+# Shorter words are matched exactly; the index keeps prefixes of 2 and 3 characters
+MIN_PREFIX_LENGTH = 2
+
+SHOWS_SEARCH = f"""
+SELECT s.id, s.name, snippet(shows_fts, 2, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet
+FROM shows_fts
+JOIN shows s ON s.rowid = shows_fts.rowid
+WHERE shows_fts MATCH ?
+ORDER BY bm25(shows_fts, 10.0, 2.0, 1.0)
+LIMIT ?
+"""
+
+EPISODES_SEARCH = f"""
+SELECT e.show_id, s.name, e.name, e.release_date,
+       snippet(episodes_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet
+FROM episodes_fts
+JOIN episodes e ON e.rowid = episodes_fts.rowid
+LEFT JOIN shows s ON s.id = e.show_id
+WHERE episodes_fts MATCH ?
+ORDER BY bm25(episodes_fts, 5.0, 1.0)
+LIMIT ?
+"""
+
+_local = threading.local()
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect_readonly(CATALOG_DB)
+    return conn
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression. Quoted parts become phrase
+    queries, other words are ANDed together and the last bare word is
+    prefix-matched so results show up while typing, once it has at least
+    MIN_PREFIX_LENGTH characters. Returns None when the text holds no
+    searchable terms.
+    """
+    terms = []
+    last_word = None
+    for phrase, word in _TERM_PATTERN.findall(text or ""):
+        if phrase.strip():
+            terms.append('"' + phrase.replace('"', "") + '"')
+            last_word = None
+        elif word:
+            terms.append(f'"{word}"')
+            last_word = word
+    if not terms:
+        return None
+    if last_word is not None and len(last_word) >= MIN_PREFIX_LENGTH and text.rstrip()[-1:] != '"':
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def search(text, limit=20):
+    """
+    Ranked keyword and phrase search over the catalog database.
+
+    :return: (shows, episodes), lists of dictionaries with a highlighted
+             `snippet` whose matches are wrapped in HIGHLIGHT_START/END
+    """
+    match_query = build_match_query(text)
+    if match_query is None:
+        return [], []
+
+    try:
+        conn = _connection()
+        shows = [
+            {"show_id": show_id, "show_name": name, "snippet": snippet}
+            for show_id, name, snippet in conn.execute(SHOWS_SEARCH, (match_query, limit))
+        ]
+        episodes = [
+            {"show_id": show_id, "show_name": show_name, "episode_name": name,
+             "release_date": release_date, "snippet": snippet}
+            for show_id, show_name, name, release_date, snippet
+            in conn.execute(EPISODES_SEARCH, (match_query, limit))
+        ]
+    except Exception as e:
+        print(f"Error searching for '{text}': {e}")
+        return [], []
+    return shows, episodes
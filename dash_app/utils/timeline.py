@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from contextlib import closing
+from utils.cache import memoize_callback, skip_cache
+from utils.catalog import CATALOG_DB, _connect_readonly
+
+# Maximum number of points sent to the browser for each plotted show
+POINTS_PER_SERIES = 400
+
+EPISODES_QUERY = """
+SELECT release_date, duration_ms
+FROM episodes
+WHERE show_id = ? AND duration_ms > 0
+ORDER BY release_date
+"""
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of at
+    most `threshold` points that preserve the visual shape of the series,
+    always keeping the first and last point.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    bucket_size = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+
+        # Average of the next bucket is the third vertex of the triangle
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+@memoize_callback(key=lambda show_id, version: (show_id, version))
+def show_timeline(show_id, version):
+    """
+    Downsampled release timeline of one show plus its per-show aggregates.
+    Cached per (show ID, live database version), since the episodes are read
+    from the database rather than the catalog snapshot. Shows without
+    episodes are not cached, as their episodes may simply not be merged yet.
+    """
+    with closing(_connect_readonly(CATALOG_DB)) as conn:
+        episodes = pd.read_sql_query(EPISODES_QUERY, conn, params=(show_id,))
+
+    released = pd.to_datetime(episodes["release_date"], errors="coerce", format="mixed")
+    episodes = episodes.assign(released=released).dropna(subset=["released"]).sort_values("released")
+    if episodes.empty:
+        skip_cache()
+        return {"x": [], "y": [], "episodes": 0, "median_minutes": None, "median_gap_days": None}
+
+    minutes = episodes["duration_ms"].to_numpy(dtype=float) / 60000.0
+    timestamps = episodes["released"].to_numpy(dtype="datetime64[ns]")
+    keep = lttb(timestamps.astype(np.int64).astype(float), minutes, POINTS_PER_SERIES)
+    gaps = np.diff(timestamps).astype("timedelta64[s]").astype(float) / 86400.0
+
+    return {
+        "x": np.datetime_as_string(timestamps[keep], unit="D").tolist(),
+        "y": np.round(minutes[keep], 1).tolist(),
+        "episodes": int(len(minutes)),
+        "median_minutes": round(float(np.median(minutes)), 1),
+        "median_gap_days": round(float(np.median(gaps)), 1) if len(gaps) else None,
+    }
@@ -0,0 +1,398 @@
+import csv
+import os
+import sqlite3
+import sys
+import time
+import change_tracking
+
+# Local catalog database shared by the crawler, the merge step and the Dash app
+CATALOG_DB = os.getenv("CATALOG_DB", "catalog.sqlite")
+# Chart the crawlers work from; podcast_data.csv is the scraper's raw output
+CHART_CSV = "top_podcasts.csv"
+
+# Episode descriptions can be much larger than csv's default field limit
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS genres (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS charts (
+    genre_id INTEGER NOT NULL REFERENCES genres (id),
+    position INTEGER NOT NULL,
+    podcast_name TEXT NOT NULL,
+    image_url TEXT,
+    PRIMARY KEY (genre_id, podcast_name)
+);
+CREATE INDEX IF NOT EXISTS idx_charts_podcast_name ON charts (podcast_name);
+
+CREATE TABLE IF NOT EXISTS shows (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    html_description TEXT,
+    publisher TEXT,
+    languages TEXT,
+    media_type TEXT,
+    total_episodes INTEGER,
+    is_externally_hosted INTEGER,
+    explicit INTEGER,
+    external_url TEXT,
+    image_url TEXT,
+    uri TEXT,
+    href TEXT,
+    genre_id INTEGER REFERENCES genres (id),
+    original_image_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_shows_name ON shows (name);
+CREATE INDEX IF NOT EXISTS idx_shows_genre ON shows (genre_id);
+
+CREATE TABLE IF NOT EXISTS markets (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS show_markets (
+    show_id TEXT NOT NULL REFERENCES shows (id),
+    market_id INTEGER NOT NULL REFERENCES markets (id),
+    PRIMARY KEY (show_id, market_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS episodes (
+    id TEXT PRIMARY KEY,
+    show_id TEXT NOT NULL REFERENCES shows (id),
+    name TEXT,
+    description TEXT,
+    html_description TEXT,
+    duration_ms INTEGER,
+    explicit INTEGER,
+    external_url TEXT,
+    href TEXT,
+    audio_preview_url TEXT,
+    language TEXT,
+    languages TEXT,
+    release_date TEXT,
+    release_date_precision TEXT,
+    type TEXT,
+    uri TEXT,
+    is_externally_hosted INTEGER,
+    is_playable INTEGER,
+    images TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_episodes_show_release ON episodes (show_id, release_date);
+CREATE INDEX IF NOT EXISTS idx_episodes_release_date ON episodes (release_date);
+CREATE INDEX IF NOT EXISTS idx_episodes_name ON episodes (name);
+
+-- Full-text indexes over shows and episodes. Both are external-content
+-- tables kept in sync by the triggers below, so new episodes become
+-- searchable as soon as they are imported. The prefix indexes serve the
+-- search-as-you-type queries on short prefixes without a term index scan.
+CREATE VIRTUAL TABLE IF NOT EXISTS shows_fts USING fts5 (
+    name, publisher, description,
+    content='shows', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS episodes_fts USING fts5 (
+    name, description,
+    content='episodes', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS shows_fts_insert AFTER INSERT ON shows BEGIN
+    INSERT INTO shows_fts (rowid, name, publisher, description)
+    VALUES (new.rowid, new.name, new.publisher, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS shows_fts_delete AFTER DELETE ON shows BEGIN
+    INSERT INTO shows_fts (shows_fts, rowid, name, publisher, description)
+    VALUES ('delete', old.rowid, old.name, old.publisher, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS shows_fts_update AFTER UPDATE ON shows BEGIN
+    INSERT INTO shows_fts (shows_fts, rowid, name, publisher, description)
+    VALUES ('delete', old.rowid, old.name, old.publisher, old.description);
+    INSERT INTO shows_fts (rowid, name, publisher, description)
+    VALUES (new.rowid, new.name, new.publisher, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS episodes_fts_insert AFTER INSERT ON episodes BEGIN
+    INSERT INTO episodes_fts (rowid, name, description)
+    VALUES (new.rowid, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS episodes_fts_delete AFTER DELETE ON episodes BEGIN
+    INSERT INTO episodes_fts (episodes_fts, rowid, name, description)
+    VALUES ('delete', old.rowid, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS episodes_fts_update AFTER UPDATE ON episodes BEGIN
+    INSERT INTO episodes_fts (episodes_fts, rowid, name, description)
+    VALUES ('delete', old.rowid, old.name, old.description);
+    INSERT INTO episodes_fts (rowid, name, description)
+    VALUES (new.rowid, new.name, new.description);
+END;
+"""
+
+EPISODE_COLUMNS = [
+    'id', 'show_id', 'name', 'description', 'html_description', 'duration_ms', 'explicit',
+    'external_url', 'href', 'audio_preview_url', 'language', 'languages', 'release_date',
+    'release_date_precision', 'type', 'uri', 'is_externally_hosted', 'is_playable', 'images'
+]
+
+def connect(db_path=CATALOG_DB):
+    """
+    Open the catalog database in WAL mode, so readers are never blocked by
+    the importer, and make sure the schema exists.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=OFF")  # Episodes may arrive before their show
+    conn.execute("PRAGMA recursive_triggers=ON")  # Fire delete triggers on INSERT OR REPLACE
+    stale_search_index = _drop_search_index_without_prefixes(conn)
+    conn.executescript(SCHEMA)
+    change_tracking.ensure_schema(conn)
+    if stale_search_index:
+        rebuild_search_index(conn)
+    return conn
+
+def _drop_search_index_without_prefixes(conn):
+    """Drop full-text tables created before they had prefix indexes, so SCHEMA recreates them."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'episodes_fts'").fetchone()
+    if row is None or "prefix=" in row[0]:
+        return False
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS shows_fts")
+        conn.execute("DROP TABLE IF EXISTS episodes_fts")
+    return True
+
+def _to_bool(value):
+    """Convert the 'True'/'False' strings written by the crawler to 0/1."""
+    if value in (None, '', 'None', 'N/A'):
+        return None
+    return 1 if str(value).strip().lower() in ('true', '1') else 0
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def bump_version(conn):
+    """Record that the catalog changed; readers use this as a cache key."""
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+        (format(time.time_ns(), 'x'),)
+    )
+
+def catalog_version(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return row[0] if row else None
+
+def _genre_ids(conn, names):
+    """Intern genre names, returning a name -> id mapping."""
+    conn.executemany("INSERT OR IGNORE INTO genres (name) VALUES (?)", [(name,) for name in set(names)])
+    return dict(conn.execute("SELECT name, id FROM genres").fetchall())
+
+def import_charts(conn, filepath):
+    """
+    Bulk-load a chart CSV (Genre, Podcast, Image) as written by fetch_top_podcast.py.
+    The file replaces the whole chart of every genre it contains, so podcasts
+    that dropped out of a genre's chart are removed.
+    """
+    with open(filepath, mode='r', encoding='utf-8') as file:
+        rows = [row for row in csv.DictReader(file) if row.get('Genre') and row.get('Podcast')]
+
+    genre_ids = _genre_ids(conn, [row['Genre'] for row in rows])
+    positions = {}
+    records = []
+    for row in rows:
+        position = positions[row['Genre']] = positions.get(row['Genre'], 0) + 1
+        records.append((genre_ids[row['Genre']], position, row['Podcast'], row.get('Image')))
+
+    with conn:
+        conn.executemany(
+            "DELETE FROM charts WHERE genre_id = ?",
+            [(genre_id,) for genre_id in {genre_ids[row['Genre']] for row in rows}]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO charts (genre_id, position, podcast_name, image_url) VALUES (?, ?, ?, ?)",
+            records
+        )
+        bump_version(conn)
+    print(f"Imported {len(records)} chart entries from {filepath}")
+
+def import_show_records(conn, shows):
+    """
+    Upsert show dictionaries shaped like the rows of podcast_details.csv,
+    including their comma-separated available_markets.
+    """
+    genre_ids = _genre_ids(conn, [show['category'] for show in shows if show.get('category')])
+    market_codes = {
+        code for show in shows
+        for code in str(show.get('available_markets') or '').split(',') if code
+    }
+    conn.executemany("INSERT OR IGNORE INTO markets (code) VALUES (?)", [(code,) for code in market_codes])
+    market_ids = dict(conn.execute("SELECT code, id FROM markets").fetchall())
+
+    show_rows = []
+    show_market_rows = []
+    for show in shows:
+        show_rows.append((
+            show['id'], show['name'], show.get('description'), show.get('html_description'),
+            show.get('publisher'), str(show.get('languages', '')), show.get('media_type'),
+            _to_int(show.get('total_episodes')), _to_bool(show.get('is_externally_hosted')),
+            _to_bool(show.get('explicit')), show.get('external_url'), show.get('image_url'),
+            show.get('uri'), show.get('href'), genre_ids.get(show.get('category')),
+            show.get('original_image_url'),
+        ))
+        show_market_rows.extend(
+            (show['id'], market_ids[code])
+            for code in str(show.get('available_markets') or '').split(',') if code
+        )
+
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO shows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            show_rows
+        )
+        conn.executemany(
+            "DELETE FROM show_markets WHERE show_id = ?",
+            [(show['id'],) for show in shows]
+        )
+        conn.executemany("INSERT OR IGNORE INTO show_markets VALUES (?, ?)", show_market_rows)
+        bump_version(conn)
+    return len(show_rows)
+
+def delete_show_records(conn, show_ids):
+    """
+    Delete shows and their market availability. Runs inside the caller's
+    transaction, so the deletion commits or rolls back together with it.
+    """
+    show_ids = [(show_id,) for show_id in show_ids]
+    conn.executemany("DELETE FROM show_markets WHERE show_id = ?", show_ids)
+    conn.executemany("DELETE FROM shows WHERE id = ?", show_ids)
+    if show_ids:
+        bump_version(conn)
+    return len(show_ids)
+
+def import_shows(conn, filepath):
+    """
+    Bulk-load podcast_details.csv. Shows that appear under several genres
+    keep their first entry, matching the Dash app's catalog.
+    """
+    seen = set()
+    shows = []
+    with open(filepath, mode='r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            if row.get('id') and row['id'] not in seen:
+                seen.add(row['id'])
+                shows.append(row)
+    count = import_show_records(conn, shows)
+    print(f"Imported {count} shows from {filepath}")
+
+def _episode_record(row, show_id):
+    return (
+        row.get('id'), show_id, row.get('name'), row.get('description'), row.get('html_description'),
+        _to_int(row.get('duration_ms')), _to_bool(row.get('explicit')),
+        row.get('external_urls') or row.get('external_url'), row.get('href'),
+        row.get('audio_preview_url'), row.get('language'), row.get('languages'),
+        row.get('release_date'), row.get('release_date_precision'), row.get('type'),
+        row.get('uri'), _to_bool(row.get('is_externally_hosted')), _to_bool(row.get('is_playable')),
+        row.get('images'),
+    )
+
+def import_episode_rows(conn, rows, show_id=None):
+    """
+    Upsert episode rows shaped like the per-show CSVs written by
+    save_episodes_to_csv. Rows without a show_id column are attributed to
+    `show_id`, or resolved through their podcast_name.
+    """
+    show_ids_by_name = None
+    records = []
+    for row in rows:
+        if not row.get('id') or row.get('id') == 'N/A':
+            continue
+        row_show_id = row.get('show_id') or show_id
+        if not row_show_id:
+            if show_ids_by_name is None:
+                show_ids_by_name = dict(conn.execute("SELECT name, id FROM shows").fetchall())
+            row_show_id = show_ids_by_name.get(row.get('podcast_name'))
+            if not row_show_id:
+                continue
+        records.append(_episode_record(row, row_show_id))
+
+    placeholders = ', '.join('?' for _ in EPISODE_COLUMNS)
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO episodes ({', '.join(EPISODE_COLUMNS)}) VALUES ({placeholders})",
+            records
+        )
+        bump_version(conn)
+    return len(records)
+
+def import_episodes(conn, filepath, show_id=None):
+    """
+    Bulk-load an episode CSV: either one crawler output file
+    (shows/<genre>/<show_id>.csv, where the file name is the show ID) or the
+    merged file written by merge_rows.py.
+    """
+    if show_id is None:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        if len(stem) == 22 and stem.isalnum():  # Spotify show IDs are 22 base62 characters
+            show_id = stem
+    with open(filepath, mode='r', encoding='utf-8') as file:
+        count = import_episode_rows(conn, csv.DictReader(file), show_id)
+    print(f"Imported {count} episodes from {filepath}")
+    return count
+
+def import_episode_directory(conn, base_directory='shows'):
+    """Bulk-load every per-show episode CSV under the crawler's output directory."""
+    total = 0
+    for root, _, files in os.walk(base_directory):
+        for file in files:
+            if file.endswith('.csv'):
+                total += import_episodes(conn, os.path.join(root, file))
+    return total
+
+def rebuild_search_index(conn):
+    """
+    Rebuild the full-text indexes from the shows and episodes tables in one
+    pass. Needed once for databases created before the indexes existed;
+    afterwards the triggers keep them current.
+    """
+    with conn:
+        conn.execute("INSERT INTO shows_fts (shows_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO episodes_fts (episodes_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO episodes_fts (episodes_fts) VALUES ('optimize')")
+    print("Rebuilt full-text search index")
+
+def get_show_total_episodes(conn, show_id):
+    row = conn.execute("SELECT total_episodes FROM shows WHERE id = ?", (show_id,)).fetchone()
+    return row[0] if row else None
+
+def get_chart_podcasts(conn):
+    """Chart entries in genre and chart order, shaped like load_podcasts_from_csv's output."""
+    return [
+        {'genre': genre, 'name': name, 'img': image}
+        for genre, name, image in conn.execute(
+            "SELECT g.name, c.podcast_name, c.image_url FROM charts c "
+            "JOIN genres g ON g.id = c.genre_id ORDER BY g.name, c.position"
+        )
+    ]
+
+def main():
+    """Build or refresh the catalog database from the CSVs in the working directory."""
+    conn = connect()
+    if os.path.exists(CHART_CSV):
+        import_charts(conn, CHART_CSV)
+    if os.path.exists('podcast_details.csv'):
+        import_shows(conn, 'podcast_details.csv')
+    if os.path.isdir('shows'):
+        import_episode_directory(conn, 'shows')
+    rebuild_search_index(conn)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import time
+
+# Content hashes of the last written version of every record, and an
+# append-only log of what changed. Each fetch stage records its changes;
+# downstream stages read the log from their own cursor and process only
+# the delta.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS record_hashes (
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (stage, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    digest TEXT,
+    path TEXT,
+    changed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_change_log_stage ON change_log (stage, seq);
+"""
+
+ADDED = 'added'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+REMOVED = 'removed'
+
+def ensure_schema(conn):
+    conn.executescript(SCHEMA)
+
+def content_hash(data):
+    """
+    Stable SHA-1 of bytes, a string or any JSON-serializable record.
+    Records are serialized with sorted keys so field order does not matter.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    elif not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+def file_hash(path):
+    """Content hash of a file, or None if it does not exist."""
+    try:
+        with open(path, 'rb') as file:
+            return content_hash(file.read())
+    except FileNotFoundError:
+        return None
+
+def stored_hashes(conn, stage):
+    """Mapping of key -> digest last recorded for `stage`."""
+    return dict(conn.execute("SELECT key, digest FROM record_hashes WHERE stage = ?", (stage,)).fetchall())
+
+def stored_hash(conn, stage, key):
+    """Digest last recorded for one record, or None if it was never recorded."""
+    row = conn.execute(
+        "SELECT digest FROM record_hashes WHERE stage = ? AND key = ?", (stage, key)
+    ).fetchone()
+    return row[0] if row else None
+
+def classify(conn, stage, key, digest):
+    """Whether a record is ADDED, CHANGED or UNCHANGED compared to its last recorded hash."""
+    previous = stored_hash(conn, stage, key)
+    if previous is None:
+        return ADDED
+    return UNCHANGED if previous == digest else CHANGED
+
+def record_changes(conn, stage, changes):
+    """
+    Store new hashes and append to the change log.
+
+    :param changes: Iterable of (key, status, digest, path) tuples; UNCHANGED entries are ignored
+    """
+    changes = [change for change in changes if change[1] != UNCHANGED]
+    if not changes:
+        return 0
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO record_hashes (stage, key, digest) VALUES (?, ?, ?)",
+            [(stage, key, digest) for key, status, digest, _ in changes if status != REMOVED]
+        )
+        conn.executemany(
+            "DELETE FROM record_hashes WHERE stage = ? AND key = ?",
+            [(stage, key) for key, status, _, _ in changes if status == REMOVED]
+        )
+        conn.executemany(
+            "INSERT INTO change_log (stage, key, status, digest, path, changed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(stage, key, status, digest, path, now) for key, status, digest, path in changes]
+        )
+    return len(changes)
+
+def cursor(conn, consumer, stage):
+    """Last change log sequence number processed by `consumer`, or None if it never ran."""
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"cursor:{consumer}:{stage}",)).fetchone()
+    return int(row[0]) if row else None
+
+def changes_since(conn, consumer, stage):
+    """
+    Latest change per key logged for `stage` since `consumer` last called
+    advance_cursor. Returns (changes, last_seq) where changes maps
+    key -> (status, path, seq).
+    """
+    last_seen = cursor(conn, consumer, stage) or 0
+
+    changes = {}
+    last_seq = last_seen
+    for seq, key, status, path in conn.execute(
+        "SELECT seq, key, status, path FROM change_log WHERE stage = ? AND seq > ? ORDER BY seq",
+        (stage, last_seen)
+    ):
+        changes[key] = (status, path, seq)
+        last_seq = seq
+    return changes, last_seq
+
+def advance_cursor(conn, consumer, stage, seq):
+    """Mark every change up to `seq` as processed by `consumer`."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (f"cursor:{consumer}:{stage}", str(seq))
+        )
@@ -0,0 +1,190 @@
+import pandas as pd
+import catalog_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS show_stats (
+    show_id TEXT PRIMARY KEY,
+    episodes INTEGER NOT NULL,
+    first_release TEXT,
+    last_release TEXT,
+    median_duration_ms REAL,
+    mean_duration_ms REAL,
+    explicit_ratio REAL,
+    episodes_per_month REAL,
+    median_gap_days REAL,
+    max_gap_days REAL,
+    top_language TEXT,
+    language_mix TEXT,
+    max_episode_rowid INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS genre_stats (
+    genre TEXT PRIMARY KEY,
+    shows INTEGER NOT NULL,
+    episodes INTEGER NOT NULL,
+    median_duration_ms REAL,
+    mean_duration_ms REAL,
+    explicit_ratio REAL,
+    median_episodes_per_month REAL,
+    median_gap_days REAL
+);
+"""
+
+SHOW_STATS_COLUMNS = [
+    'show_id', 'episodes', 'first_release', 'last_release', 'median_duration_ms',
+    'mean_duration_ms', 'explicit_ratio', 'episodes_per_month', 'median_gap_days',
+    'max_gap_days', 'top_language', 'language_mix', 'max_episode_rowid'
+]
+
+def _changed_show_ids(conn):
+    """
+    Shows with episodes inserted or replaced since their stats were computed.
+    Every upsert gives the episode a new rowid, so comparing against the
+    largest rowid seen per show catches both new and updated episodes.
+    """
+    return [row[0] for row in conn.execute(
+        "SELECT e.show_id FROM episodes e "
+        "LEFT JOIN show_stats s ON s.show_id = e.show_id "
+        "GROUP BY e.show_id "
+        "HAVING MAX(e.rowid) > COALESCE(MAX(s.max_episode_rowid), -1)"
+    )]
+
+def _load_episodes(conn, show_ids):
+    """Load the columns needed for the statistics, for the given shows only."""
+    frames = []
+    # Stay below SQLite's bound-parameter limit
+    for start in range(0, len(show_ids), 500):
+        chunk = show_ids[start:start + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        frames.append(pd.read_sql_query(
+            f"SELECT rowid AS episode_rowid, show_id, duration_ms, explicit, language, release_date "
+            f"FROM episodes WHERE show_id IN ({placeholders})",
+            conn, params=chunk
+        ))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def compute_show_stats(episodes):
+    """
+    Per-show statistics computed with vectorized group-bys.
+
+    :param episodes: DataFrame with episode_rowid, show_id, duration_ms, explicit,
+                     language and release_date columns
+    :return: DataFrame with one row per show and SHOW_STATS_COLUMNS columns
+    """
+    episodes = episodes.assign(
+        released=pd.to_datetime(episodes['release_date'], errors='coerce', format='mixed'),
+        duration_ms=pd.to_numeric(episodes['duration_ms'], errors='coerce'),
+        explicit=pd.to_numeric(episodes['explicit'], errors='coerce'),
+        language=episodes['language'].fillna('Unknown'),
+    ).sort_values(['show_id', 'released'])
+
+    grouped = episodes.groupby('show_id', sort=False)
+    stats = grouped.agg(
+        episodes=('episode_rowid', 'size'),
+        first_release=('released', 'min'),
+        last_release=('released', 'max'),
+        median_duration_ms=('duration_ms', 'median'),
+        mean_duration_ms=('duration_ms', 'mean'),
+        explicit_ratio=('explicit', 'mean'),
+        max_episode_rowid=('episode_rowid', 'max'),
+    )
+
+    # Gaps between consecutive releases within each show
+    gap_days = grouped['released'].diff().dt.total_seconds() / 86400.0
+    gap_stats = gap_days.groupby(episodes['show_id']).agg(['median', 'max'])
+    stats['median_gap_days'] = gap_stats['median']
+    stats['max_gap_days'] = gap_stats['max']
+
+    span_months = (stats['last_release'] - stats['first_release']).dt.days / 30.44
+    stats['episodes_per_month'] = (stats['episodes'] / span_months.where(span_months > 0)).round(2)
+
+    # Language mix as "en:0.95,es:0.05", top three languages per show
+    shares = (
+        episodes.groupby(['show_id', 'language']).size()
+        .div(stats['episodes'], level='show_id')
+        .sort_values(ascending=False)
+    )
+    top_shares = shares.groupby(level='show_id').head(3).reset_index(name='share')
+    top_shares['entry'] = top_shares['language'] + ':' + top_shares['share'].round(2).astype(str)
+    stats['language_mix'] = top_shares.groupby('show_id')['entry'].agg(','.join)
+    stats['top_language'] = top_shares.groupby('show_id')['language'].first()
+
+    stats['first_release'] = stats['first_release'].dt.strftime('%Y-%m-%d')
+    stats['last_release'] = stats['last_release'].dt.strftime('%Y-%m-%d')
+    return stats.reset_index()[SHOW_STATS_COLUMNS]
+
+def compute_genre_stats(conn):
+    """
+    Per-genre statistics rolled up from show_stats, so they stay cheap to
+    refresh after an incremental update. Duration and explicit ratios are
+    weighted by episode count; frequency and gaps are medians across shows.
+    """
+    shows = pd.read_sql_query(
+        "SELECT g.name AS genre, st.* FROM show_stats st "
+        "JOIN shows s ON s.id = st.show_id JOIN genres g ON g.id = s.genre_id",
+        conn
+    )
+    if shows.empty:
+        return pd.DataFrame()
+
+    shows = shows.assign(
+        weighted_duration=shows['mean_duration_ms'] * shows['episodes'],
+        weighted_explicit=shows['explicit_ratio'] * shows['episodes'],
+    )
+    grouped = shows.groupby('genre')
+    stats = grouped.agg(
+        shows=('show_id', 'size'),
+        episodes=('episodes', 'sum'),
+        median_duration_ms=('median_duration_ms', 'median'),
+        weighted_duration=('weighted_duration', 'sum'),
+        weighted_explicit=('weighted_explicit', 'sum'),
+        median_episodes_per_month=('episodes_per_month', 'median'),
+        median_gap_days=('median_gap_days', 'median'),
+    )
+    stats['mean_duration_ms'] = stats.pop('weighted_duration') / stats['episodes']
+    stats['explicit_ratio'] = stats.pop('weighted_explicit') / stats['episodes']
+    return stats.reset_index()
+
+def update_episode_stats(conn, full=False):
+    """
+    Refresh show_stats for the shows whose episodes changed since the last
+    run (or every show when `full` is set), then rebuild genre_stats.
+    """
+    conn.executescript(SCHEMA)
+    show_ids = (
+        [row[0] for row in conn.execute("SELECT DISTINCT show_id FROM episodes")]
+        if full else _changed_show_ids(conn)
+    )
+    if not show_ids:
+        print("Episode statistics are up to date.")
+        return 0
+
+    show_stats = compute_show_stats(_load_episodes(conn, show_ids))
+    placeholders = ', '.join('?' for _ in SHOW_STATS_COLUMNS)
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO show_stats ({', '.join(SHOW_STATS_COLUMNS)}) VALUES ({placeholders})",
+            show_stats.astype(object).where(show_stats.notna(), None).itertuples(index=False, name=None)
+        )
+
+    genre_stats = compute_genre_stats(conn)
+    with conn:
+        conn.execute("DELETE FROM genre_stats")
+        if not genre_stats.empty:
+            columns = list(genre_stats.columns)
+            conn.executemany(
+                f"INSERT INTO genre_stats ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                genre_stats.astype(object).where(genre_stats.notna(), None).itertuples(index=False, name=None)
+            )
+        catalog_db.bump_version(conn)
+
+    print(f"Updated statistics for {len(show_stats)} shows and {len(genre_stats)} genres.")
+    return len(show_stats)
+
+def main():
+    conn = catalog_db.connect()
+    update_episode_stats(conn)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 
 import base64
+import io
 import os
 import time
 import csv
@@ -8,6 +9,8 @@ import pandas as pd
 from dotenv import load_dotenv
 from requests import post, get
 from tqdm import tqdm
+import catalog_db
+import change_tracking
 
 # Load environment variables
 load_dotenv(override=True)
@@ -54,25 +57,31 @@ def get_auth_header():
         token_info['access_token'] = get_token()
     return {"Authorization": f"Bearer {token_info['access_token']}"}
 
-def validate_scraped_episodes(podcast_name, show_id, scraped_count, details_filepath='podcast_details.csv'):
+def validate_scraped_episodes(podcast_name, show_id, scraped_count, details_filepath='podcast_details.csv', conn=None):
     """
-    Validate that the number of scraped episodes matches the expected total episodes from podcast_details.csv.
+    Validate that the number of scraped episodes matches the expected total episodes,
+    looked up in the catalog database when `conn` is given and in podcast_details.csv
+    when it is not or the show is not in the database yet.
     """
     try:
-        # Load the podcast details CSV
-        podcast_details = pd.read_csv(details_filepath)
-
-        # Find the row for the given podcast by name and ID
-        podcast_row = podcast_details[(podcast_details['name'] == podcast_name) & 
-                                       (podcast_details['id'] == show_id)]
-        
-        if podcast_row.empty:
+        expected_count = None
+        if conn is not None:
+            expected_count = catalog_db.get_show_total_episodes(conn, show_id)
+        if expected_count is not None:
+            details_filepath = catalog_db.CATALOG_DB
+        elif conn is None or os.path.exists(details_filepath):
+            # Load the podcast details CSV
+            podcast_details = pd.read_csv(details_filepath)
+
+            # Find the row for the given podcast by name and ID
+            podcast_row = podcast_details[(podcast_details['name'] == podcast_name) & 
+                                           (podcast_details['id'] == show_id)]
+            expected_count = None if podcast_row.empty else int(podcast_row.iloc[0]['total_episodes'])
+
+        if expected_count is None:
             print(f"Warning: Podcast '{podcast_name}' with ID '{show_id}' not found in {details_filepath}. Skipping validation.")
             return True  # Skip validation if details are missing
 
-        # Get the total_episodes value from the CSV
-        expected_count = int(podcast_row.iloc[0]['total_episodes'])
-
         # Compare the scraped count with the expected count
         if scraped_count != expected_count:
             print(f"Validation Failed: Podcast '{podcast_name}' has {scraped_count} episodes scraped, "
@@ -231,9 +240,12 @@ def load_podcasts_from_csv(filepath='top_podcasts.csv'):
 
     return podcasts
 
-def save_episodes_to_csv(episodes, show_id, podcast_name, genre='', details_filepath='podcast_details.csv'):
+def save_episodes_to_csv(episodes, show_id, podcast_name, genre='', details_filepath='podcast_details.csv', conn=None):
     """
     Save the list of episodes to a CSV file with show ID as filename.
+    The file is left untouched when its content would not change. When `conn`
+    is given, changed shows are recorded in its change log, from which
+    merge_rows.py loads them into the catalog database.
     """
     if not episodes:
         print(f"No episodes to save for {podcast_name}")
@@ -241,7 +253,7 @@ def save_episodes_to_csv(episodes, show_id, podcast_name, genre='', details_file
     
     # Validate scraped episode count against expected total episodes from the details CSV
     scraped_count = len(episodes)
-    if not validate_scraped_episodes(podcast_name, show_id, scraped_count, details_filepath):
+    if not validate_scraped_episodes(podcast_name, show_id, scraped_count, details_filepath, conn):
         print(f"Skipping saving episodes for '{podcast_name}' due to validation failure.")
         return
 
@@ -262,7 +274,8 @@ def save_episodes_to_csv(episodes, show_id, podcast_name, genre='', details_file
     ]
 
     try:
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
+        # Render the CSV in memory first so it can be compared with the file on disk
+        with io.StringIO() as file:
             writer = csv.DictWriter(file, fieldnames=headers)
             writer.writeheader()
 
@@ -272,7 +285,7 @@ def save_episodes_to_csv(episodes, show_id, podcast_name, genre='', details_file
                         raise ValueError("Malformed episode data.")
 
                     # Safely extract nested fields and provide robust fallbacks
-                    writer.writerow({
+                    row = {
                         'id': episode.get('id', 'N/A'),  # Use 'N/A' to signify missing IDs
                         'audio_preview_url': episode.get('audio_preview_url', 'N/A'),
                         'description': episode.get('description', 'No description available'),
@@ -294,15 +307,41 @@ def save_episodes_to_csv(episodes, show_id, podcast_name, genre='', details_file
                         'is_playable': episode.get('is_playable', None),
                         'images': '; '.join([img.get('url', 'N/A') for img in episode.get('images', [])]) 
                                 if isinstance(episode.get('images'), list) else 'N/A'
-                    })
+                    }
+                    writer.writerow(row)
         
                 except Exception as row_error:
                     print(f"Error writing episode row for podcast '{podcast_name}': {row_error}")
                     # Log detailed information for troubleshooting
                     with open("problematic_episodes.log", "a") as log_file:
                         log_file.write(f"Podcast: {podcast_name}, Error: {row_error}, Episode: {episode}\n")
-                    
-        print(f"Saved {len(episodes)} episodes for {podcast_name} to {filename}")
+
+            content = file.getvalue().encode('utf-8')
+
+        # Compare with the last logged version rather than the file, so a file
+        # replaced before its change could be logged is logged on the next run.
+        # Records are keyed by file: a show charted in several genres has one per genre.
+        digest = change_tracking.content_hash(content)
+        if conn is not None:
+            status = change_tracking.classify(conn, 'episodes', filename, digest)
+        else:
+            previous_digest = change_tracking.file_hash(filename)
+            status = change_tracking.ADDED if previous_digest is None else (
+                change_tracking.UNCHANGED if previous_digest == digest else change_tracking.CHANGED
+            )
+        if status == change_tracking.UNCHANGED:
+            print(f"Episodes for {podcast_name} unchanged; leaving {filename} untouched")
+            return
+
+        if change_tracking.file_hash(filename) != digest:
+            tmp_filename = f"{filename}.tmp"
+            with open(tmp_filename, mode='wb') as out_file:
+                out_file.write(content)
+            os.replace(tmp_filename, filename)
+            print(f"Saved {len(episodes)} episodes for {podcast_name} to {filename}")
+
+        if conn is not None:
+            change_tracking.record_changes(conn, 'episodes', [(filename, status, digest, filename)])
 
     except Exception as e:
         print(f"Error saving CSV for {podcast_name}: {e}")
@@ -313,7 +352,7 @@ def sanitize_filename(name):
     """
     return re.sub(r'[^\w\s-]', '', str(name)).replace(" ", "_")
 
-def process_podcast(podcast, token):
+def process_podcast(podcast, token, conn=None):
     """
     Process a single podcast with enhanced error handling.
     """
@@ -335,7 +374,7 @@ def process_podcast(podcast, token):
                 log_file.write(f"No episodes found for: {name} (Show ID: {show_id})\n")
             return f"No episodes found for {name}"
 
-        save_episodes_to_csv(episodes, show_id, name, genre)
+        save_episodes_to_csv(episodes, show_id, name, genre, conn=conn)
         return f"Processed {name} - {len(episodes)} episodes"
 
     except Exception as e:
@@ -352,14 +391,16 @@ def main():
         print("Failed to obtain Spotify API token. Exiting.")
         return
 
-    podcasts = load_podcasts_from_csv()
+    # Read the chart from the catalog database, falling back to the CSV before it is built
+    conn = catalog_db.connect()
+    podcasts = catalog_db.get_chart_podcasts(conn) or load_podcasts_from_csv()
     problem_podcasts = []
 
     for log_file in ["unresolved_podcasts.log", "no_episodes_podcasts.log", "podcast_processing_errors.log"]:
         open(log_file, 'w').close()
 
     for podcast in tqdm(podcasts, desc="Processing Podcasts"):
-        result = process_podcast(podcast, token)
+        result = process_podcast(podcast, token, conn)
         print(result)
         if "Error" in result or "No show ID" in result or "No episodes" in result:
             problem_podcasts.append(podcast)
@@ -369,5 +410,7 @@ def main():
     for prob_podcast in problem_podcasts:
         print(f"- {prob_podcast.get('name', 'Unknown')}")
 
+    conn.close()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,6 +6,8 @@ import spotipy
 from dotenv import load_dotenv
 from spotipy.oauth2 import SpotifyClientCredentials
 import pandas as pd
+import catalog_db
+import change_tracking
 
 class SpotifyPodcastFetcher:
     def __init__(self, client_id, client_secret):
@@ -57,12 +59,14 @@ class SpotifyPodcastFetcher:
             print(f"Error searching for podcast {podcast_name}: {e}")
             return None
     
-    def fetch_podcasts_from_csv(self, input_csv, output_csv):
+    def fetch_podcasts_from_csv(self, input_csv, output_csv, conn=None):
         """
         Fetch podcast details from a CSV and save results to another CSV
         
         :param input_csv: Path to input CSV with podcast names
         :param output_csv: Path to output CSV with podcast details
+        :param conn: Optional catalog database connection. Shows whose details changed are
+                     loaded into it and recorded in its change log
         """
         # Read the input CSV
         df = pd.read_csv(input_csv, header=None, names=['category', 'podcast_name', 'image_url'])
@@ -89,11 +93,67 @@ class SpotifyPodcastFetcher:
             except Exception as e:
                 print(f"Error processing {row['podcast_name']}: {e}")
         
-        # Convert to DataFrame and save
+        # Convert to DataFrame and save, leaving the file untouched if nothing changed
         results_df = pd.DataFrame(podcast_details)
-        results_df.to_csv(output_csv, index=False)
-        
-        print(f"Saved {len(results_df)} podcast details to {output_csv}")
+        content = results_df.to_csv(index=False).encode('utf-8')
+        if change_tracking.content_hash(content) == change_tracking.file_hash(output_csv):
+            print(f"Podcast details unchanged; leaving {output_csv} untouched")
+        else:
+            with open(output_csv, mode='wb') as file:
+                file.write(content)
+            print(f"Saved {len(results_df)} podcast details to {output_csv}")
+
+        if conn is not None:
+            self.record_changes(conn, input_csv, output_csv, podcast_details)
+
+    def record_changes(self, conn, input_csv, output_csv, podcast_details):
+        """
+        Compare per-show content hashes with the previous run, load only the
+        added or changed shows into the catalog database, delete the shows
+        that are gone and log the delta.
+
+        :param conn: Catalog database connection
+        :param input_csv: Path to the chart CSV the details were fetched for
+        :param output_csv: Path the details were saved to
+        :param podcast_details: List of podcast detail dictionaries from this run
+        """
+        chart_digest = change_tracking.file_hash(input_csv)
+        chart_status = change_tracking.classify(conn, 'charts', input_csv, chart_digest)
+        if chart_status != change_tracking.UNCHANGED:
+            catalog_db.import_charts(conn, input_csv)
+            change_tracking.record_changes(conn, 'charts', [(input_csv, chart_status, chart_digest, input_csv)])
+
+        # A show charting in several genres is hashed as the list of all its entries
+        records_by_id = {}
+        for podcast_info in podcast_details:
+            records_by_id.setdefault(podcast_info['id'], []).append(podcast_info)
+
+        previous = change_tracking.stored_hashes(conn, 'shows')
+        changes = []
+        changed_shows = []
+        for show_id, records in records_by_id.items():
+            digest = change_tracking.content_hash(records)
+            if show_id not in previous:
+                status = change_tracking.ADDED
+            elif previous[show_id] != digest:
+                status = change_tracking.CHANGED
+            else:
+                continue
+            changes.append((show_id, status, digest, output_csv))
+            changed_shows.append(records[0])
+        changes.extend(
+            (show_id, change_tracking.REMOVED, None, output_csv)
+            for show_id in previous if show_id not in records_by_id
+        )
+
+        if changed_shows:
+            catalog_db.import_show_records(conn, changed_shows)
+        # Removed shows are deleted in the transaction record_changes commits
+        catalog_db.delete_show_records(
+            conn, [show_id for show_id, status, _, _ in changes if status == change_tracking.REMOVED]
+        )
+        change_tracking.record_changes(conn, 'shows', changes)
+        print(f"{len(changes)} shows added, changed or removed since the last run")
 
 def main():
     # Load environment variables
@@ -109,7 +169,9 @@ def main():
     fetcher = SpotifyPodcastFetcher(CLIENT_ID, CLIENT_SECRET)
     
     # Fetch and save podcast details
-    fetcher.fetch_podcasts_from_csv(INPUT_CSV, OUTPUT_CSV)
+    conn = catalog_db.connect()
+    fetcher.fetch_podcasts_from_csv(INPUT_CSV, OUTPUT_CSV, conn)
+    conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
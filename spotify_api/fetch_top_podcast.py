@@ -1,101 +1,224 @@
-
-import time
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+CHARTS_URL = "https://podcastcharts.byspotify.com/"
+SHOW_CLASS = "Show_show__jq9gl"
+ALL_GENRES = [
+    "Arts", "Business", "Comedy", "Education", "Fiction", "Health & Fitness",
+    "History", "Leisure", "Music", "News", "Religion & Spirituality", "Science",
+    "Society & Culture", "Sports", "Technology", "True Crime", "TV & Film"
+]
+WAIT_TIMEOUT = 15  # Seconds to wait for the chart to render before giving up
+SELECT_ATTEMPTS = 2  # Times a genre is selected before it is skipped
 
-def setup_webdriver(download_dir):
-    """Sets up and returns a WebDriver instance with download directory configured."""
+def setup_webdriver(download_dir=None, geckodriver_path=None):
+    """
+    Sets up and returns a headless Firefox WebDriver instance. The geckodriver
+    path comes from the argument or GECKODRIVER_PATH; without either,
+    Selenium locates the driver itself.
+    """
     try:
-        geckodriver_path = "/home/stochastic1017/.wdm/drivers/geckodriver/linux64/v0.35.0/geckodriver"
-        service = FirefoxService(executable_path=geckodriver_path)
+        geckodriver_path = geckodriver_path or os.getenv("GECKODRIVER_PATH")
+        service = FirefoxService(executable_path=geckodriver_path) if geckodriver_path else FirefoxService()
         options = FirefoxOptions()
         options.add_argument("--headless")
-        options.set_preference("browser.download.folderList", 2)
-        options.set_preference("browser.download.dir", download_dir)
-        options.set_preference("browser.download.manager.showWhenStarting", False)
-        options.set_preference("browser.helperApps.neverAsk.saveToDisk", "application/zip")
+        if download_dir:
+            options.set_preference("browser.download.folderList", 2)
+            options.set_preference("browser.download.dir", download_dir)
+            options.set_preference("browser.download.manager.showWhenStarting", False)
+            options.set_preference("browser.helperApps.neverAsk.saveToDisk", "application/zip")
         options.set_preference("pdfjs.disabled", True)
-        
+
         driver = webdriver.Firefox(service=service, options=options)
         return driver
     except Exception as e:
         raise Exception(f"Failed to setup WebDriver: {str(e)}")
 
-def extract_podcast_data(driver, genre):
-    """Extracts podcast names and images for the given genre."""
+class ChartPageParser(HTMLParser):
+    """
+    Extracts podcast names and images from the chart page's HTML.
+    Mirrors the selectors used against the live page: every element with
+    class Show_show__jq9gl is one podcast, its name is the text of
+    `div.w-full div.text-accent0 span span` and its image is the first <img>.
+    """
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__()
+        self.podcasts = []
+        self._stack = []
+        self._show_depth = None
+        self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+
+        if self._show_depth is None and SHOW_CLASS in classes:
+            self._show_depth = len(self._stack)
+            self._current = {"name": [], "image": None}
+        elif self._current is not None and tag == "img" and self._current["image"] is None:
+            self._current["image"] = attrs.get("src")
+
+        if tag not in self.VOID_TAGS:
+            self._stack.append((tag, classes))
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        # Pop up to and including the matching tag to tolerate unclosed elements
+        while self._stack:
+            open_tag, _ = self._stack.pop()
+            if open_tag == tag:
+                break
+        if self._show_depth is not None and len(self._stack) <= self._show_depth:
+            name = " ".join("".join(self._current["name"]).split())
+            if name:
+                self.podcasts.append({"Podcast": name, "Image": self._current["image"]})
+            self._show_depth = None
+            self._current = None
+
+    def handle_data(self, data):
+        if self._current is not None and self._in_name_element():
+            self._current["name"].append(data)
+
+    def _in_name_element(self):
+        inner = self._stack[self._show_depth + 1:]
+        if len(inner) < 4 or [tag for tag, _ in inner[-2:]] != ["span", "span"]:
+            return False
+        # A div.w-full must enclose a div.text-accent0, which encloses the two spans
+        for i, (tag, classes) in enumerate(inner[:-2]):
+            if tag == "div" and "w-full" in classes:
+                return any(
+                    tag == "div" and "text-accent0" in classes
+                    for tag, classes in inner[i + 1:-2]
+                )
+        return False
+
+def parse_chart_html(html, genre):
+    """Extracts podcast names and images for the given genre from a saved chart page."""
+    parser = ChartPageParser()
+    parser.feed(html)
+    parser.close()
+    return [{"Genre": genre, **podcast} for podcast in parser.podcasts]
+
+def load_chart_snapshots(snapshot_dir):
+    """
+    Parse chart pages saved by scrape_genres(snapshot_dir=...), one
+    <genre>.html file per genre, without starting a browser.
+    """
     data = []
+    for genre in ALL_GENRES:
+        path = os.path.join(snapshot_dir, f"{_snapshot_name(genre)}.html")
+        if os.path.exists(path):
+            with open(path, mode="r", encoding="utf-8") as file:
+                data.extend(parse_chart_html(file.read(), genre))
+    return data
+
+def _snapshot_name(genre):
+    return "".join(c if c.isalnum() else "_" for c in genre)
+
+def _select_genre(driver, wait, genre):
+    """Open the category dropdown and pick `genre`, waiting for each element to be clickable."""
+    dropdown = wait.until(EC.element_to_be_clickable((By.ID, "categoryDropdown")))
+    driver.execute_script("window.scrollBy(0, -150); arguments[0].scrollIntoView({block: 'center'});", dropdown)
+    dropdown.click()
+    genre_option = wait.until(EC.element_to_be_clickable((By.XPATH, f"//span[text()='{genre}']")))
+    ActionChains(driver).move_to_element(genre_option).click().perform()
+
+def scrape_genres(genres, snapshot_dir=None, geckodriver_path=None):
+    """
+    Scrape the chart for each genre in `genres` with a single browser.
+    Instead of fixed sleeps, waits until the rendered shows differ from the
+    previously seen chart. Optionally saves each page for offline parsing.
+    """
+    data = []
+    driver = setup_webdriver(geckodriver_path=geckodriver_path)
+    wait = WebDriverWait(driver, WAIT_TIMEOUT)
     try:
-        podcasts = driver.find_elements(By.CLASS_NAME, "Show_show__jq9gl")
-        for podcast in podcasts:
+        driver.get(CHARTS_URL)
+        wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, SHOW_CLASS)))
+        previous = parse_chart_html(driver.page_source, None)
+
+        for genre in genres:
             try:
-                name_element = podcast.find_element(By.CSS_SELECTOR, "div.w-full div.text-accent0 span span")
-                image_element = podcast.find_element(By.TAG_NAME, "img")
-                podcast_name = name_element.text.strip()
-                podcast_image = image_element.get_attribute("src")
-                data.append({"Genre": genre, "Podcast": podcast_name, "Image": podcast_image})
-            except Exception as inner_e:
-                print(f"Error extracting data for one podcast: {inner_e}")
-    except Exception as e:
-        print(f"Error extracting podcast data for genre '{genre}': {e}")
+                podcasts = None
+                for attempt in range(1, SELECT_ATTEMPTS + 1):
+                    _select_genre(driver, wait, genre)
+                    print(f"Selected genre: {genre}")
+
+                    # The chart re-renders in place; wait until it shows a new, non-empty list
+                    try:
+                        podcasts = wait.until(
+                            lambda d: (rows := parse_chart_html(d.page_source, genre))
+                            and [row["Podcast"] for row in rows] != [row["Podcast"] for row in previous]
+                            and rows
+                        )
+                        break
+                    except TimeoutException:
+                        print(f"Chart for '{genre}' did not change within {WAIT_TIMEOUT}s "
+                              f"(attempt {attempt}/{SELECT_ATTEMPTS}).")
+
+                # The page still shows the previous genre's chart; saving it would mislabel its rows
+                if podcasts is None:
+                    print(f"Skipping genre '{genre}'.")
+                    continue
+
+                if snapshot_dir:
+                    os.makedirs(snapshot_dir, exist_ok=True)
+                    with open(os.path.join(snapshot_dir, f"{_snapshot_name(genre)}.html"), mode="w", encoding="utf-8") as file:
+                        file.write(driver.page_source)
+
+                data.extend(podcasts)
+                previous = podcasts
+            except Exception as e:
+                print(f"Error processing genre '{genre}': {e}")
+    finally:
+        driver.quit()
     return data
 
-# Main Script
-download_dir = "/home/stochastic1017/Downloads"
-driver = setup_webdriver(download_dir)
-driver.get("https://podcastcharts.byspotify.com/")
-all_genre = [
-    "Arts", "Business", "Comedy", "Education", "Fiction", "Health & Fitness",
-    "History", "Leisure", "Music", "News", "Religion & Spirituality", "Science", 
-    "Society & Culture", "Sports", "Technology", "True Crime", "TV & Film"
-]
+def scrape_charts(genres=ALL_GENRES, max_workers=4, snapshot_dir=None, geckodriver_path=None):
+    """
+    Scrape all genres with a pool of browsers. Genres are dealt round-robin
+    so each worker owns a fixed subset; results keep the order of `genres`.
+    """
+    max_workers = max(1, min(max_workers, len(genres)))
+    subsets = [genres[i::max_workers] for i in range(max_workers)]
 
-print("\nExtracting podcast data by genre...\n")
-genre_podcast_data = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda subset: scrape_genres(subset, snapshot_dir, geckodriver_path), subsets)
+        by_genre = {}
+        for rows in results:
+            for row in rows:
+                by_genre.setdefault(row["Genre"], []).append(row)
 
-try:
-    # Locate and click on the dropdown
-    dropdown = driver.find_element(By.ID, "categoryDropdown")
-    driver.execute_script("window.scrollBy(0, -150); arguments[0].scrollIntoView({block: 'center'});", dropdown)
-    time.sleep(2)
-    dropdown.click()
-    time.sleep(2)
-
-    # Loop through each genre
-    for genre in all_genre:
-        try:
-            # Select genre from dropdown
-            genre_option = driver.find_element(By.XPATH, f"//span[text()='{genre}']")
-            ActionChains(driver).move_to_element(genre_option).click().perform()
-            print(f"Selected genre: {genre}")
-            time.sleep(3)  # Wait for the page to load
-
-            # Extract data for the selected genre
-            data = extract_podcast_data(driver, genre)
-            genre_podcast_data.extend(data)
-
-            # Reopen the dropdown for the next genre
-            dropdown.click()
-            time.sleep(2)
-        except Exception as e:
-            print(f"Error processing genre '{genre}': {e}")
-
-finally:
-    driver.quit()
-
-# Output the collected data
-for entry in genre_podcast_data:
-    print(entry)
-
-# Optional: Save the data to a CSV file
-import csv
+    return [row for genre in genres for row in by_genre.get(genre, [])]
+
+def save_chart_csv(data, output_file):
+    with open(output_file, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=["Genre", "Podcast", "Image"])
+        writer.writeheader()
+        writer.writerows(data)
+    print(f"\nData saved to {output_file}")
+
+def main():
+    output_file = "podcast_data.csv"
+    max_workers = int(os.getenv("SCRAPER_WORKERS", 4))
+    snapshot_dir = os.getenv("CHART_SNAPSHOT_DIR")
 
-output_file = "podcast_data.csv"
-with open(output_file, mode="w", newline="", encoding="utf-8") as file:
-    writer = csv.DictWriter(file, fieldnames=["Genre", "Podcast", "Image"])
-    writer.writeheader()
-    writer.writerows(genre_podcast_data)
+    print("\nExtracting podcast data by genre...\n")
+    genre_podcast_data = scrape_charts(ALL_GENRES, max_workers=max_workers, snapshot_dir=snapshot_dir)
+    save_chart_csv(genre_podcast_data, output_file)
 
-print(f"\nData saved to {output_file}")
+if __name__ == "__main__":
+    main()
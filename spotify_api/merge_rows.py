@@ -1,43 +1,133 @@
 
 import os
 import pandas as pd
+import catalog_db
+import change_tracking
+import episode_stats
+import text_corpus
 
-def merge_all_csv_in_directory(base_directory, output_file):
+# Per-show file each merged row came from, relative to the base directory;
+# lets an incremental merge replace exactly the rows of the changed files
+SOURCE_COLUMN = 'source_file'
+
+def _read_episode_csv(path):
+    # Read values as written so rows round-trip unchanged through incremental merges
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+def merge_all_csv_in_directory(base_directory, output_file, conn=None, full=False):
     """
     Recursively merges all CSV files in a directory and its subdirectories into a single DataFrame.
     
     Parameters:
         base_directory (str): The root directory to start the search.
         output_file (str): The path to save the merged CSV file.
+        conn (sqlite3.Connection): Optional catalog database connection. Files logged as
+            changed since the last merge are bulk-loaded into its episodes table and
+            replace their rows in the merged file, without reading the other files.
+            The merge is skipped entirely when nothing changed. The first merge into a
+            database loads every file, including ones written before the change log existed.
+        full (bool): Load every file into the database regardless of the change log.
+
+    Files that fail to load stay pending: the change log cursor is not moved
+    past their entries, so the next merge retries them.
     """
-    all_csv_files = []
-    
-    # Walk through the directory and subdirectories to find CSV files
-    for root, _, files in os.walk(base_directory):
-        for file in files:
-            if file.endswith('.csv'):
-                all_csv_files.append(os.path.join(root, file))
+    changed_paths = None
+    removed_paths = set()
+    if conn is not None:
+        changes, last_seq = change_tracking.changes_since(conn, 'merge', 'episodes')
+        previous_cursor = change_tracking.cursor(conn, 'merge', 'episodes')
+        if not full and previous_cursor is not None:
+            if not changes and os.path.exists(output_file):
+                print("No episode files changed since the last merge; nothing to do.")
+                return
+            # Log sequence number of each changed file, to hold the cursor before failed ones
+            changed_paths = {
+                os.path.abspath(path): seq for status, path, seq in changes.values()
+                if path and status != change_tracking.REMOVED
+            }
+            removed_paths = {
+                os.path.abspath(path) for status, path, _ in changes.values()
+                if path and status == change_tracking.REMOVED
+            }
+
+    merged_data = None
+    if changed_paths is not None and os.path.exists(output_file):
+        try:
+            merged_data = _read_episode_csv(output_file)
+        except pd.errors.EmptyDataError:
+            pass  # Nothing was merged yet; rebuild it
+        if merged_data is not None and SOURCE_COLUMN not in merged_data.columns:
+            merged_data = None  # Written before rows were tagged with their file; rebuild it
+
+    if merged_data is not None:
+        # Incremental: only the changed files are read
+        csv_files = [path for path in changed_paths if os.path.exists(path)]
+        removed_paths |= {path for path in changed_paths if not os.path.exists(path)}
+    else:
+        csv_files = []
+        # Walk through the directory and subdirectories to find CSV files
+        for root, _, files in os.walk(base_directory):
+            for file in files:
+                if file.endswith('.csv'):
+                    csv_files.append(os.path.join(root, file))
     
-    # Merge all CSV files
-    merged_data = pd.DataFrame()
-    for csv_file in all_csv_files:
+    # Read every file, then concatenate once
+    frames = []
+    read_sources = []
+    failed_paths = []
+    for csv_file in csv_files:
+        needs_import = conn is not None and (changed_paths is None or os.path.abspath(csv_file) in changed_paths)
         try:
             print(f"Reading {csv_file}...")
-            data = pd.read_csv(csv_file)
-            merged_data = pd.concat([merged_data, data], ignore_index=True)
+            source = os.path.relpath(os.path.abspath(csv_file), os.path.abspath(base_directory))
+            frames.append(_read_episode_csv(csv_file).assign(**{SOURCE_COLUMN: source}))
+            read_sources.append(source)
         except Exception as e:
             print(f"Error reading {csv_file}: {e}")
+            if needs_import:
+                failed_paths.append(os.path.abspath(csv_file))
+            continue
+        if needs_import:
+            try:
+                catalog_db.import_episodes(conn, csv_file)
+            except Exception as e:
+                print(f"Error importing {csv_file}: {e}")
+                failed_paths.append(os.path.abspath(csv_file))
+
+    if merged_data is not None:
+        # Files that could not be read keep their previous rows until they are retried
+        stale_sources = set(read_sources) | {
+            os.path.relpath(path, os.path.abspath(base_directory)) for path in removed_paths
+        }
+        frames.insert(0, merged_data[~merged_data[SOURCE_COLUMN].isin(stale_sources)])
+    merged_data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     
     # Save merged data to a single CSV file
     try:
-        merged_data.to_csv(output_file, index=False)
-        print(f"Successfully merged {len(all_csv_files)} files into {output_file}")
+        tmp_file = f"{output_file}.tmp"
+        merged_data.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, output_file)
+        print(f"Successfully merged {len(read_sources)} files into {output_file}")
     except Exception as e:
         print(f"Error saving merged file: {e}")
+        return
+
+    if conn is None:
+        return
+    if failed_paths:
+        print(f"{len(failed_paths)} episode files failed to load and will be retried by the next merge")
+        if changed_paths is None:
+            return  # Without a cursor to hold back, keep the next merge a full one
+        last_seq = min(changed_paths[path] for path in failed_paths) - 1
+    change_tracking.advance_cursor(conn, 'merge', 'episodes', last_seq)
 
 if __name__ == "__main__":
     # Update these paths accordingly
     BASE_DIRECTORY = "shows/"  # Replace with your directory path
     OUTPUT_FILE = "merged_episodes.csv"         # Replace with your desired output file name
     
-    merge_all_csv_in_directory(BASE_DIRECTORY, OUTPUT_FILE)
+    conn = catalog_db.connect()
+    merge_all_csv_in_directory(BASE_DIRECTORY, OUTPUT_FILE, conn)
+    episode_stats.update_episode_stats(conn)
+    text_corpus.update_corpus(conn)
+    conn.close()
@@ -0,0 +1,232 @@
+import html
+import os
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import catalog_db
+
+# Tokenized corpus of episode text shared by the recommender and search indexing
+CORPUS_PATH = "episode_corpus.npz"
+CHUNK_SIZE = 20000  # Episodes per chunk handed to a worker process
+CHUNKS_PER_WORKER = 2  # Chunks submitted ahead per worker, bounding what is held in memory
+MAX_TOKEN_LENGTH = 64  # Longer runs are leftovers such as URLs or encoded blobs, not words
+
+# Every upsert gives an episode a new rowid, so rowids above the corpus'
+# watermark are exactly the episodes added or changed since it was built
+EPISODES_QUERY = """
+SELECT rowid AS episode_rowid, id, show_id, name, description, html_description
+FROM episodes
+WHERE rowid > ?
+ORDER BY rowid
+"""
+
+_TAG_PATTERN = r"<[^>]+>"
+_TOKEN_PATTERN = r"\w+"
+
+def normalize_text(texts):
+    """
+    Strip HTML, decode entities, apply NFKC unicode normalization, casefold
+    and collapse whitespace over a whole Series of strings at once.
+    """
+    texts = texts.fillna("").astype(str)
+    texts = texts.str.replace(_TAG_PATTERN, " ", regex=True)
+    # Entities and unicode normalization are skipped for the common plain-ASCII, entity-free rows
+    needs_unescape = texts.str.contains("&", regex=False)
+    texts = texts.where(~needs_unescape, texts[needs_unescape].map(html.unescape))
+    needs_unicode = ~texts.map(str.isascii)
+    texts = texts.where(~needs_unicode, texts[needs_unicode].map(lambda text: unicodedata.normalize("NFKC", text)))
+    texts = texts.str.casefold()
+    return texts.str.replace(r"\s+", " ", regex=True).str.strip()
+
+def tokenize_chunk(episodes):
+    """
+    Normalize and tokenize one chunk of episodes. Runs in a worker process.
+
+    :param episodes: DataFrame with episode_rowid, id, name, description and html_description columns
+    :return: (episode_ids, tokens, lengths, max_rowid): the chunk's episode
+             IDs, every token in document order, the number of tokens per
+             episode and the chunk's largest rowid
+    """
+    episodes = episodes.reset_index(drop=True)
+    # Prefer the HTML description, which is never truncated, and fall back to the plain one
+    body = episodes["html_description"].where(
+        episodes["html_description"].notna() & (episodes["html_description"] != "No HTML description"),
+        episodes["description"]
+    )
+    text = normalize_text(episodes["name"].fillna("") + " . " + body.fillna(""))
+    tokens = text.str.findall(_TOKEN_PATTERN).explode().dropna()
+    tokens = tokens[tokens.str.len() <= MAX_TOKEN_LENGTH]
+    lengths = tokens.groupby(level=0).size().reindex(episodes.index, fill_value=0).to_numpy(dtype=np.int64)
+    return (
+        episodes["id"].to_numpy(dtype=object),
+        tokens.to_numpy(dtype=object),
+        lengths,
+        int(episodes["episode_rowid"].max()),
+    )
+
+def _tokenize_chunks(chunks, max_workers):
+    """
+    Tokenize chunks in a process pool and yield the results in chunk order.
+    Only CHUNKS_PER_WORKER chunks per worker are read and submitted ahead of
+    the one being consumed, so the episodes table is streamed rather than
+    loaded whole.
+    """
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk in chunks:
+            if chunk.empty:  # read_sql_query yields one empty chunk when nothing matches
+                continue
+            pending.append(executor.submit(tokenize_chunk, chunk))
+            if len(pending) >= CHUNKS_PER_WORKER * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class Vocabulary:
+    """Interns tokens into dense integer IDs in order of first appearance."""
+    def __init__(self, tokens=()):
+        self.tokens = list(tokens)
+        self.ids = {token: i for i, token in enumerate(self.tokens)}
+
+    def encode(self, tokens):
+        """Map an array of tokens to uint32 IDs, adding unseen tokens."""
+        for token in pd.unique(tokens):
+            if token not in self.ids:
+                self.ids[token] = len(self.tokens)
+                self.tokens.append(token)
+        return pd.Series(tokens, dtype=object).map(self.ids).to_numpy(dtype=np.uint32)
+
+    def to_arrays(self):
+        """
+        Pack the tokens as one UTF-8 byte array plus offsets. Unlike a
+        fixed-width string array, its size does not grow with the longest token.
+        """
+        encoded = [token.encode("utf-8") for token in self.tokens]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(token) for token in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @classmethod
+    def from_arrays(cls, data, offsets):
+        data = data.tobytes()
+        return cls(data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:]))
+
+def _empty_corpus():
+    return {
+        "episode_ids": np.zeros(0, dtype=str),
+        "vocabulary": Vocabulary(),
+        "token_ids": np.zeros(0, dtype=np.uint32),
+        "offsets": np.zeros(1, dtype=np.int64),
+        "max_rowid": 0,
+    }
+
+def _save_corpus(corpus, path):
+    vocabulary_data, vocabulary_offsets = corpus["vocabulary"].to_arrays()
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        episode_ids=corpus["episode_ids"],
+        vocabulary_data=vocabulary_data,
+        vocabulary_offsets=vocabulary_offsets,
+        token_ids=corpus["token_ids"],
+        offsets=corpus["offsets"],
+        max_rowid=np.int64(corpus["max_rowid"]),
+    )
+    os.replace(tmp_path, path)
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    Load a corpus written by update_corpus.
+
+    :return: Dictionary with episode_ids, vocabulary (a Vocabulary), token_ids,
+             offsets and max_rowid; the tokens of document i are
+             token_ids[offsets[i]:offsets[i + 1]]
+    """
+    with np.load(path, allow_pickle=False) as data:
+        return {
+            "episode_ids": data["episode_ids"],
+            "vocabulary": Vocabulary.from_arrays(data["vocabulary_data"], data["vocabulary_offsets"]),
+            "token_ids": data["token_ids"],
+            "offsets": data["offsets"],
+            "max_rowid": int(data["max_rowid"]),
+        }
+
+def _drop_documents(corpus, episode_ids):
+    """Remove the documents of `episode_ids`, which are about to be re-tokenized."""
+    keep = ~np.isin(corpus["episode_ids"], episode_ids)
+    if keep.all():
+        return corpus
+    lengths = np.diff(corpus["offsets"])
+    offsets = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    np.cumsum(lengths[keep], out=offsets[1:])
+    return {
+        **corpus,
+        "episode_ids": corpus["episode_ids"][keep],
+        "token_ids": corpus["token_ids"][np.repeat(keep, lengths)],
+        "offsets": offsets,
+    }
+
+def update_corpus(conn, path=CORPUS_PATH, max_workers=None, full=False, chunk_size=CHUNK_SIZE):
+    """
+    Bring the corpus up to date with the episodes table: tokenize episodes
+    added or changed since the last run, in chunks across a process pool,
+    and replace their previous documents. Token IDs stay stable across
+    updates. The corpus is rebuilt from scratch when `full` is set, when it
+    does not exist yet, or when episodes were deleted from the table.
+
+    The corpus holds the vocabulary, every document's token IDs concatenated
+    into one uint32 array and per-document offsets into it.
+    """
+    corpus = None
+    if not full and os.path.exists(path):
+        try:
+            corpus = load_corpus(path)
+        except Exception as e:
+            print(f"Rebuilding unreadable corpus {path}: {e}")
+    corpus = corpus or _empty_corpus()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    vocabulary = corpus["vocabulary"]
+    episode_ids, token_ids, lengths = [], [], []
+    max_rowid = corpus["max_rowid"]
+    chunks = pd.read_sql_query(EPISODES_QUERY, conn, params=(max_rowid,), chunksize=chunk_size)
+    for chunk_ids, chunk_tokens, chunk_lengths, chunk_max_rowid in _tokenize_chunks(chunks, max_workers):
+        episode_ids.append(chunk_ids)
+        token_ids.append(vocabulary.encode(chunk_tokens))
+        lengths.append(chunk_lengths)
+        max_rowid = max(max_rowid, chunk_max_rowid)
+        print(f"Tokenized {sum(len(ids) for ids in episode_ids)} episodes, "
+              f"{len(vocabulary.tokens)} distinct tokens so far")
+
+    if episode_ids:
+        new_ids = np.concatenate(episode_ids).astype(str)
+        corpus = _drop_documents(corpus, new_ids)
+        new_offsets = np.cumsum(np.concatenate(lengths)) + corpus["offsets"][-1]
+        corpus = {
+            "episode_ids": np.concatenate([corpus["episode_ids"], new_ids]),
+            "vocabulary": vocabulary,
+            "token_ids": np.concatenate([corpus["token_ids"]] + token_ids),
+            "offsets": np.concatenate([corpus["offsets"], new_offsets]),
+            "max_rowid": max_rowid,
+        }
+
+    episode_count = conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0]
+    if len(corpus["episode_ids"]) != episode_count and not full:
+        print("Episodes were deleted since the corpus was built; rebuilding it")
+        return update_corpus(conn, path, max_workers, full=True, chunk_size=chunk_size)
+
+    if not episode_ids and os.path.exists(path):
+        print(f"{path} is up to date")
+        return
+    _save_corpus(corpus, path)
+    print(f"Saved {len(corpus['episode_ids'])} episodes and {len(vocabulary.tokens)} tokens to {path}")
+
+def main():
+    conn = catalog_db.connect()
+    update_corpus(conn)
+    conn.close()
+
+if __name__ == "__main__":
+    main()